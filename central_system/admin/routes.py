@@ -1,14 +1,22 @@
+import asyncio
 import logging
 import json
-from typing import List, Dict, Any
+import time
+from collections import Counter, defaultdict
+from operator import methodcaller
+from typing import List, Dict, Any, Optional, Tuple
 from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+from pathlib import Path
 from datetime import datetime, timedelta
 
 from models.database import DatabaseManager
 from agents.agent_manager import AgentManager
 from core.adaptive_learner import AdaptiveLearner
+from config.settings import settings
+from utils.helpers import utc_now_iso
 from api.dependencies import (
     get_database,
     get_agent_manager,
@@ -19,8 +27,69 @@ from api.dependencies import (
 router = APIRouter(prefix="/admin", tags=["admin"])
 logger = logging.getLogger(__name__)
 
-# Setup templates
-templates = Jinja2Templates(directory="admin/templates")
+# Setup templates - compiled templates are kept for the process lifetime and
+# only re-checked on disk when running in debug mode
+ADMIN_TEMPLATES = (
+    "dashboard.html",
+    "agents.html",
+    "incidents.html",
+    "forensic.html",
+    "settings.html",
+    "incident_details.html",
+    "error.html"
+)
+
+templates = Jinja2Templates(
+    directory="admin/templates",
+    auto_reload=settings.DEBUG,
+    cache_size=-1,
+    bytecode_cache=FileSystemBytecodeCache(settings.TEMPLATE_CACHE_DIR)
+)
+
+def warm_template_cache():
+    """Compile all admin templates up front so the first request skips parsing"""
+    try:
+        Path(settings.TEMPLATE_CACHE_DIR).mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        # Templates still compile in memory; only the on-disk bytecode cache is lost
+        logger.warning(f"Template bytecode cache disabled, cannot create {settings.TEMPLATE_CACHE_DIR}: {e}")
+        templates.env.bytecode_cache = None
+    
+    for template_name in ADMIN_TEMPLATES:
+        templates.get_template(template_name)
+    logger.info(f"Admin templates precompiled: {len(ADMIN_TEMPLATES)}")
+
+# Short-lived cache of rendered bodies for the pages/endpoints the dashboard polls
+_response_cache: Dict[str, Tuple[float, bytes]] = {}
+
+def _get_cached_body(key: str) -> Optional[bytes]:
+    """Return a cached response body if it is younger than ADMIN_CACHE_TTL"""
+    entry = _response_cache.get(key)
+    if entry and time.monotonic() - entry[0] < settings.ADMIN_CACHE_TTL:
+        return entry[1]
+    return None
+
+def _cache_body(key: str, body: bytes):
+    """Store a rendered response body for reuse by subsequent polls"""
+    _response_cache[key] = (time.monotonic(), body)
+
+# Column readers so counting runs in C (map + Counter) rather than a
+# Python-level generator over every row
+_status_column = methodcaller('get', 'status')
+_threat_level_column = methodcaller('get', 'threat_level')
+
+def _compute_dashboard_stats(agents: List[Dict[str, Any]], recent_alerts: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Compute the dashboard counters in one place for every stats consumer"""
+    agents_by_status = Counter(map(_status_column, agents))
+    alerts_by_level = Counter(map(_threat_level_column, recent_alerts))
+    
+    return {
+        'total_agents': len(agents),
+        'online_agents': agents_by_status['online'],
+        'total_incidents': len(recent_alerts),
+        'critical_incidents': alerts_by_level['critical'],
+        'emergency_active': alerts_by_level['critical'] + alerts_by_level['high']
+    }
 
 @router.get("/", response_class=HTMLResponse)
 async def admin_dashboard(
@@ -29,21 +98,21 @@ async def admin_dashboard(
     agent_manager: AgentManager = Depends(get_agent_manager)
 ):
     """Admin dashboard main page"""
+    cached = _get_cached_body("dashboard")
+    if cached is not None:
+        return HTMLResponse(cached)
+    
     try:
-        # Get system statistics
-        agents = await db.get_all_agents()  # Use db directly since agent_manager method is missing
-        recent_alerts = await db.get_recent_alerts(hours=24)
+        # Get system statistics - both reads are independent, so overlap them
+        agents, recent_alerts = await asyncio.gather(
+            db.get_all_agents(),  # Use db directly since agent_manager method is missing
+            db.get_recent_alerts(hours=24)
+        )
         
         # Calculate stats
-        stats = {
-            'total_agents': len(agents),
-            'online_agents': len([a for a in agents if a.get('status') == 'online']),
-            'total_incidents': len(recent_alerts),
-            'critical_incidents': len([a for a in recent_alerts if a.get('threat_level') == 'critical']),
-            'emergency_active': len([a for a in recent_alerts if a.get('threat_level') in ['critical', 'high']])
-        }
+        stats = _compute_dashboard_stats(agents, recent_alerts)
         
-        return templates.TemplateResponse(
+        response = templates.TemplateResponse(
             "dashboard.html",
             {
                 "request": request,
@@ -52,6 +121,8 @@ async def admin_dashboard(
                 "agents": agents[:10]
             }
         )
+        _cache_body("dashboard", response.body)
+        return response
     except Exception as e:
         logger.error(f"Admin dashboard error: {e}")
         return templates.TemplateResponse(
@@ -67,26 +138,10 @@ async def admin_agents(
 ):
     """Agents management page"""
     try:
-        agents = await db.get_all_agents()  # Use db directly
-        
-        # Create simple topology since agent_manager.get_network_topology might not exist
-        topology = {
-            'total_agents': len(agents),
-            'online_agents': len([a for a in agents if a.get('status') == 'online']),
-            'agents_by_department': {},
-            'critical_assets': [],
-            'connected_agents': []
-        }
-        
-        # Group by department
-        for agent in agents:
-            dept = agent.get('department', 'unknown')
-            if dept not in topology['agents_by_department']:
-                topology['agents_by_department'][dept] = []
-            topology['agents_by_department'][dept].append(agent['agent_id'])
-            
-            # Collect critical assets
-            topology['critical_assets'].extend(agent.get('critical_assets', []))
+        agents, topology = await asyncio.gather(
+            agent_manager.get_all_agents(),
+            agent_manager.get_network_topology()
+        )
         
         return templates.TemplateResponse(
             "agents.html",
@@ -112,12 +167,14 @@ async def admin_incidents(
     try:
         incidents = await db.get_recent_alerts(hours=168)  # 1 week
         
-        # Group by severity
+        # Group by severity in a single pass
+        by_level = defaultdict(list)
+        for incident in incidents:
+            by_level[incident.get('threat_level')].append(incident)
+        
         incidents_by_severity = {
-            'critical': [i for i in incidents if i.get('threat_level') == 'critical'],
-            'high': [i for i in incidents if i.get('threat_level') == 'high'],
-            'medium': [i for i in incidents if i.get('threat_level') == 'medium'],
-            'low': [i for i in incidents if i.get('threat_level') == 'low']
+            level: by_level.get(level, [])
+            for level in ('critical', 'high', 'medium', 'low')
         }
         
         return templates.TemplateResponse(
@@ -204,73 +261,88 @@ async def admin_settings(
         )
 
 # API endpoints for real-time data
-@router.get("/api/stats")
+@router.get("/api/stats", response_class=ORJSONResponse)
 async def get_system_stats(
     db: DatabaseManager = Depends(get_database)
 ):
     """Get real-time system statistics"""
+    cached = _get_cached_body("stats")
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
     try:
-        agents = await db.get_all_agents()
-        recent_alerts = await db.get_recent_alerts(hours=24)
+        agents, recent_alerts = await asyncio.gather(
+            db.get_all_agents(),
+            db.get_recent_alerts(hours=24)
+        )
         
-        return {
-            "total_agents": len(agents),
-            "online_agents": len([a for a in agents if a.get('status') == 'online']),
-            "total_incidents": len(recent_alerts),
-            "critical_incidents": len([a for a in recent_alerts if a.get('threat_level') == 'critical']),
-            "emergency_active": len([a for a in recent_alerts if a.get('threat_level') in ['critical', 'high']]),
-            "timestamp": datetime.now().isoformat()
-        }
+        stats = _compute_dashboard_stats(agents, recent_alerts)
+        stats["timestamp"] = utc_now_iso()
+        response = ORJSONResponse(stats)
+        _cache_body("stats", response.body)
+        return response
     except Exception as e:
         logger.error(f"Error getting system stats: {e}")
-        return {
+        return ORJSONResponse({
             "total_agents": 0,
             "online_agents": 0,
             "total_incidents": 0,
             "critical_incidents": 0,
             "emergency_active": 0,
-            "timestamp": datetime.now().isoformat()
-        }
+            "timestamp": utc_now_iso()
+        })
 
-@router.get("/api/incidents/recent")
+@router.get("/api/incidents/recent", response_class=ORJSONResponse)
 async def get_recent_incidents(
     db: DatabaseManager = Depends(get_database)
 ):
     """Get recent incidents for dashboard"""
+    cached = _get_cached_body("incidents_recent")
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
     try:
         incidents = await db.get_recent_alerts(hours=24)
-        return {
+        response = ORJSONResponse({
             "incidents": incidents[:10],
             "total": len(incidents),
-            "timestamp": datetime.now().isoformat()
-        }
+            "timestamp": utc_now_iso()
+        })
+        _cache_body("incidents_recent", response.body)
+        return response
     except Exception as e:
         logger.error(f"Error getting recent incidents: {e}")
-        return {
+        return ORJSONResponse({
             "incidents": [],
             "total": 0,
-            "timestamp": datetime.now().isoformat()
-        }
+            "timestamp": utc_now_iso()
+        })
 
-@router.get("/api/agents/status")
+@router.get("/api/agents/status", response_class=ORJSONResponse)
 async def get_agents_status(
     db: DatabaseManager = Depends(get_database)
 ):
     """Get agents status for dashboard"""
+    cached = _get_cached_body("agents_status")
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
     try:
         agents = await db.get_all_agents()
-        return {
+        response = ORJSONResponse({
             "agents": agents,
-            "online_count": len([a for a in agents if a.get('status') == 'online']),
-            "timestamp": datetime.now().isoformat()
-        }
+            "online_count": Counter(map(_status_column, agents))['online'],
+            "timestamp": utc_now_iso()
+        })
+        _cache_body("agents_status", response.body)
+        return response
     except Exception as e:
         logger.error(f"Error getting agents status: {e}")
-        return {
+        return ORJSONResponse({
             "agents": [],
             "online_count": 0,
-            "timestamp": datetime.now().isoformat()
-        }
+            "timestamp": utc_now_iso()
+        })
 @router.get("/incidents/{incident_id}", response_class=HTMLResponse)
 async def incident_details(
     request: Request,
@@ -279,16 +351,16 @@ async def incident_details(
 ):
     """Incident details page with processing steps"""
     try:
-        # Get incident details
-        incidents = await db.get_recent_alerts(hours=168)
+        # Get incident details and processing logs concurrently
+        incidents, processing_logs = await asyncio.gather(
+            db.get_recent_alerts(hours=168),
+            db.get_processing_logs(incident_id)
+        )
         incident = next((inc for inc in incidents if inc.get('incident_id') == incident_id), None)
         
         if not incident:
             raise HTTPException(status_code=404, detail="Incident not found")
         
-        # Get processing logs
-        processing_logs = await db.get_processing_logs(incident_id)
-        
         return templates.TemplateResponse(
             "incident_details.html",
             {
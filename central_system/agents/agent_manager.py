@@ -118,12 +118,14 @@
 #         for agent_id in disconnected_agents:
 #             await self.unregister_agent(agent_id)
 
+import asyncio
 import logging
-import json
-from typing import Dict, List, Any, Optional
+import orjson
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from models.schemas import AgentRegistration
 from models.database import DatabaseManager
+from config.settings import settings
 
 class AgentManager:
     def __init__(self, db: DatabaseManager):
@@ -131,6 +133,13 @@ class AgentManager:
         self.logger = logging.getLogger(__name__)
         self.connected_agents: Dict[str, Any] = {}  # agent_id -> websocket
         self.agent_registrations: Dict[str, AgentRegistration] = {}  # ✅ ADD THIS to store registration data
+        self._topology_cache: Optional[Dict[str, Any]] = None  # rebuilt lazily after any agent state change
+        self.topology_version = 0  # bumped whenever the cached topology is dropped
+
+    def _invalidate_topology(self):
+        """Drop the cached topology so the next reader rebuilds it"""
+        self._topology_cache = None
+        self.topology_version += 1
 
     async def register_agent(self, agent_data: AgentRegistration, websocket: Any = None) -> bool:
         """Register a new agent with the central system"""
@@ -140,6 +149,8 @@ class AgentManager:
             if success and websocket:
                 self.connected_agents[agent_data.agent_id] = websocket
                 self.agent_registrations[agent_data.agent_id] = agent_data  # ✅ STORE REGISTRATION DATA
+            if success:
+                self._invalidate_topology()
                 
             return success
         except Exception as e:
@@ -213,6 +224,7 @@ class AgentManager:
             del self.connected_agents[agent_id]
         if agent_id in self.agent_registrations:  # ✅ ALSO CLEAN UP REGISTRATION
             del self.agent_registrations[agent_id]
+        self._invalidate_topology()
         self.logger.info(f"Agent unregistered: {agent_id}")
 
     # ... rest of your existing methods remain the same ...
@@ -236,34 +248,51 @@ class AgentManager:
             self.logger.error(f"Error getting agent: {e}")
             return None
 
-    async def get_network_topology(self) -> Dict[str, Any]:
-        """Get current network topology and agent relationships"""
+    async def get_agents_with_department_index(self) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+        """Get all agents together with their agent IDs grouped by department"""
         agents = await self.get_all_agents()
         
-        topology = {
-            'total_agents': len(agents),
-            'online_agents': len([a for a in agents if a.get('status') == 'online']),
-            'agents_by_department': {},
-            'critical_assets': [],
-            'connected_agents': list(self.connected_agents.keys())
-        }
-        
-        # Group by department
+        agents_by_department: Dict[str, List[str]] = {}
         for agent in agents:
-            dept = agent.get('department', 'unknown')
-            if dept not in topology['agents_by_department']:
-                topology['agents_by_department'][dept] = []
-            topology['agents_by_department'][dept].append(agent['agent_id'])
+            agents_by_department.setdefault(agent.get('department', 'unknown'), []).append(agent['agent_id'])
+        
+        return agents, agents_by_department
+
+    async def get_network_topology(self) -> Dict[str, Any]:
+        """Get current network topology and agent relationships (cached until agent state changes)"""
+        topology = self._topology_cache
+        if topology is None:
+            agents, agents_by_department = await self.get_agents_with_department_index()
             
-            # Collect critical assets
-            topology['critical_assets'].extend(agent.get('critical_assets', []))
+            topology = {
+                'total_agents': len(agents),
+                'online_agents': len([a for a in agents if a.get('status') == 'online']),
+                'agents_by_department': agents_by_department,
+                'critical_assets': [asset for agent in agents for asset in agent.get('critical_assets', [])]
+            }
+            
+            # An empty result may just be a failed DB read, so only cache real fleets
+            if agents:
+                self._topology_cache = topology
         
-        return topology
+        # Callers get their own copy so changes to it never reach the cache;
+        # connected agents are read live rather than cached
+        return {
+            **topology,
+            'agents_by_department': {
+                department: list(agent_ids)
+                for department, agent_ids in topology['agents_by_department'].items()
+            },
+            'critical_assets': list(topology['critical_assets']),
+            'connected_agents': list(self.connected_agents.keys())
+        }
 
     async def get_related_agents(self, agent_id: str) -> List[str]:
         """Get agents that are related to the given agent"""
-        topology = await self.get_network_topology()
-        agent = await self.get_agent(agent_id)
+        topology, agent = await asyncio.gather(
+            self.get_network_topology(),
+            self.get_agent(agent_id)
+        )
         
         if not agent:
             return []
@@ -276,7 +305,7 @@ class AgentManager:
         """Update agent status and threat level"""
         # This would update the agent in the database
         # Implementation depends on database structure
-        pass
+        self._invalidate_topology()
 
     async def update_agent_heartbeat(self, agent_id: str):
         """Update agent heartbeat timestamp"""
@@ -288,16 +317,30 @@ class AgentManager:
         if target_agents is None:
             target_agents = list(self.connected_agents.keys())
         
-        disconnected_agents = []
+        # Serialize once and fan the same payload out to every recipient
+        payload = orjson.dumps(message)
+        recipients = [
+            (agent_id, self.connected_agents[agent_id])
+            for agent_id in target_agents
+            if agent_id in self.connected_agents
+        ]
+        # A stalled socket times out on its own instead of holding up the others
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(websocket.send_bytes(payload), timeout=settings.BROADCAST_SEND_TIMEOUT)
+                for _, websocket in recipients
+            ),
+            return_exceptions=True
+        )
         
-        for agent_id in target_agents:
-            websocket = self.connected_agents.get(agent_id)
-            if websocket:
-                try:
-                    await websocket.send_text(json.dumps(message))
-                except Exception as e:
-                    self.logger.error(f"Error sending to agent {agent_id}: {e}")
-                    disconnected_agents.append(agent_id)
+        disconnected_agents = []
+        for (agent_id, _), result in zip(recipients, results):
+            if isinstance(result, asyncio.TimeoutError):
+                self.logger.error(f"Timed out sending to agent {agent_id}")
+                disconnected_agents.append(agent_id)
+            elif isinstance(result, Exception):
+                self.logger.error(f"Error sending to agent {agent_id}: {result}")
+                disconnected_agents.append(agent_id)
         
         # Clean up disconnected agents
         for agent_id in disconnected_agents:
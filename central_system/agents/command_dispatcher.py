@@ -1,9 +1,30 @@
 import logging
-import json
 from typing import Dict, List, Any
 from datetime import datetime
 from models.schemas import BroadcastMessage, ThreatLevel
 
+# Emergency protocol command sets by risk tier
+_CRITICAL_NETWORK_COMMANDS = (
+    'block_p2p_communications',
+    'enable_enhanced_zero_trust',
+    'activate_preemptive_file_protection',
+    'isolate_critical_infrastructure',
+    'trigger_emergency_backups'
+)
+
+_HIGH_NETWORK_COMMANDS = (
+    'restrict_lateral_movement',
+    'enable_process_whitelisting',
+    'lock_sensitive_directories',
+    'increase_monitoring_sensitivity'
+)
+
+_MONITORING_NETWORK_COMMANDS = (
+    'enable_preventive_protection',
+    'monitor_similar_patterns',
+    'ready_isolation_protocols'
+)
+
 class CommandDispatcher:
     def __init__(self, agent_manager):
         self.agent_manager = agent_manager
@@ -11,6 +32,13 @@ class CommandDispatcher:
 
     async def dispatch_agent_command(self, agent_id: str, commands: List[str], incident_id: str = None):
         """Dispatch commands to a specific agent"""
+        await self.dispatch_agent_commands_bulk([agent_id], commands, incident_id)
+
+    async def dispatch_agent_commands_bulk(self, agent_ids: List[str], commands: List[str], incident_id: str = None):
+        """Dispatch the same commands to several agents as one broadcast"""
+        if not agent_ids:
+            return
+        
         message = {
             'type': 'AGENT_COMMANDS',
             'incident_id': incident_id,
@@ -18,12 +46,10 @@ class CommandDispatcher:
             'timestamp': datetime.now().isoformat()
         }
         
-        await self.agent_manager.broadcast_to_agents(
-            json.dumps(message), 
-            [agent_id]
-        )
+        # One message build and one serialization for every recipient
+        await self.agent_manager.broadcast_to_agents(message, agent_ids)
         
-        self.logger.info(f"Dispatched {len(commands)} commands to agent {agent_id}")
+        self.logger.info(f"Dispatched {len(commands)} commands to {len(agent_ids)} agents")
 
     # async def broadcast_network_incident(self, incident_data: Dict[str, Any]):
     #     """Broadcast network-wide incident notification"""
@@ -81,34 +107,18 @@ class CommandDispatcher:
         
         if risk_score >= 8.0:
             # Critical threat - aggressive containment
-            network_commands = [
-                'block_p2p_communications',
-                'enable_enhanced_zero_trust',
-                'activate_preemptive_file_protection',
-                'isolate_critical_infrastructure',
-                'trigger_emergency_backups'
-            ]
+            network_commands = _CRITICAL_NETWORK_COMMANDS
         elif risk_score >= 5.0:
             # High threat - targeted containment
-            network_commands = [
-                'restrict_lateral_movement',
-                'enable_process_whitelisting',
-                'lock_sensitive_directories',
-                'increase_monitoring_sensitivity'
-            ]
+            network_commands = _HIGH_NETWORK_COMMANDS
         else:
             # Medium/Low threat - enhanced monitoring
-            network_commands = [
-                'enable_preventive_protection',
-                'monitor_similar_patterns',
-                'ready_isolation_protocols'
-            ]
+            network_commands = _MONITORING_NETWORK_COMMANDS
         
-        # Dispatch to affected agents
+        # Dispatch to affected agents as a single broadcast
         affected_agents = incident_response['risk_assessment'].get('exposed_agents', [])
-        for agent_id in affected_agents:
-            await self.dispatch_agent_command(
-                agent_id, 
-                network_commands,
-                incident_response['incident_id']
-            )
\ No newline at end of file
+        await self.dispatch_agent_commands_bulk(
+            affected_agents,
+            network_commands,
+            incident_response['incident_id']
+        )
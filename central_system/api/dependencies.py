@@ -1,47 +1,46 @@
-from typing import AsyncGenerator
-from fastapi import Depends
+from fastapi import Request
 from core.llm_intelligence import LLMIntelligence
 from core.forensic_correlator import ForensicCorrelator
 from core.coordination_engine import CoordinationEngine
 from core.adaptive_learner import AdaptiveLearner
 from agents.agent_manager import AgentManager
 from agents.command_dispatcher import CommandDispatcher
+from api.websocket_manager import WebSocketManager
 from models.database import DatabaseManager
-from config.settings import settings
 
 # Dependency injection setup
-async def get_database() -> AsyncGenerator[DatabaseManager, None]:
+# Components are created once in the application lifespan and shared through
+# app.state, so requests never build their own DatabaseManager or lose the
+# AgentManager websocket registry. Providers are async so FastAPI calls them
+# directly on the event loop instead of dispatching to the threadpool.
+async def get_database(request: Request) -> DatabaseManager:
     """Database dependency"""
-    db = DatabaseManager(settings.DATABASE_URL)
-    await db.initialize()
-    try:
-        yield db
-    finally:
-        pass
-
-async def get_agent_manager(db: DatabaseManager = Depends(get_database)) -> AgentManager:
+    return request.app.state.db
+
+async def get_agent_manager(request: Request) -> AgentManager:
     """Agent manager dependency"""
-    return AgentManager(db)
+    return request.app.state.agent_manager
 
-async def get_command_dispatcher(agent_manager: AgentManager = Depends(get_agent_manager)) -> CommandDispatcher:
+async def get_command_dispatcher(request: Request) -> CommandDispatcher:
     """Command dispatcher dependency"""
-    return CommandDispatcher(agent_manager)
+    return request.app.state.command_dispatcher
 
-async def get_llm_intelligence() -> LLMIntelligence:
+async def get_llm_intelligence(request: Request) -> LLMIntelligence:
     """LLM intelligence dependency"""
-    return LLMIntelligence()
+    return request.app.state.llm_intelligence
 
-async def get_forensic_correlator(db: DatabaseManager = Depends(get_database)) -> ForensicCorrelator:
+async def get_forensic_correlator(request: Request) -> ForensicCorrelator:
     """Forensic correlator dependency"""
-    return ForensicCorrelator(db)
+    return request.app.state.forensic_correlator
 
-async def get_adaptive_learner(db: DatabaseManager = Depends(get_database)) -> AdaptiveLearner:
+async def get_adaptive_learner(request: Request) -> AdaptiveLearner:
     """Adaptive learner dependency"""
-    return AdaptiveLearner(db)
+    return request.app.state.adaptive_learner
 
-async def get_coordination_engine(
-    agent_manager: AgentManager = Depends(get_agent_manager),
-    command_dispatcher: CommandDispatcher = Depends(get_command_dispatcher)
-) -> CoordinationEngine:
+async def get_coordination_engine(request: Request) -> CoordinationEngine:
     """Coordination engine dependency"""
-    return CoordinationEngine(agent_manager, command_dispatcher)
\ No newline at end of file
+    return request.app.state.coordination_engine
+
+async def get_websocket_manager(request: Request) -> WebSocketManager:
+    """WebSocket manager dependency"""
+    return request.app.state.websocket_manager
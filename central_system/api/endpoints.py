@@ -1,25 +1,33 @@
 import logging
-from typing import List, Optional
+import time
+import orjson
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, HTTPException, Depends
-from datetime import datetime
+from fastapi.responses import ORJSONResponse, Response
 
 from models.schemas import ThreatAlert
-from utils.helpers import generate_incident_id
+from utils.helpers import generate_incident_id, utc_now_iso
 from api.dependencies import (
     get_agent_manager,
     get_coordination_engine,
     get_adaptive_learner,
     get_forensic_correlator,
-    get_llm_intelligence
+    get_llm_intelligence,
+    get_websocket_manager
 )
 from agents.agent_manager import AgentManager
 from core.coordination_engine import CoordinationEngine
 from core.adaptive_learner import AdaptiveLearner
 from core.forensic_correlator import ForensicCorrelator
 from core.llm_intelligence import LLMIntelligence
+from api.websocket_manager import WebSocketManager
+
+# Encoded topology reused until the agent fleet changes or the TTL expires
+TOPOLOGY_CACHE_TTL = 1.0
+_topology_response: Dict[str, Any] = {"ts": 0.0, "version": -1, "body": b""}
 
 # Create FastAPI router
-router = APIRouter(prefix="/api/v1", tags=["central-intelligence"])
+router = APIRouter(prefix="/api/v1", tags=["central-intelligence"], default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
 @router.get("/health")
@@ -27,7 +35,7 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": utc_now_iso(),
         "version": "1.0.0",
         "service": "Central Intelligence System"
     }
@@ -41,7 +49,7 @@ async def get_agents(
     return {
         "agents": agents,
         "total_count": len(agents),
-        "timestamp": datetime.now().isoformat()
+        "timestamp": utc_now_iso()
     }
 
 @router.get("/agents/{agent_id}")
@@ -60,15 +68,25 @@ async def get_network_topology(
     agent_manager: AgentManager = Depends(get_agent_manager)
 ):
     """Get network topology"""
+    now = time.monotonic()
+    if (_topology_response["version"] == agent_manager.topology_version
+            and now - _topology_response["ts"] < TOPOLOGY_CACHE_TTL):
+        return Response(content=_topology_response["body"], media_type="application/json")
+    
+    # Read the version first so a change during the rebuild is not masked
+    version = agent_manager.topology_version
     topology = await agent_manager.get_network_topology()
-    return topology
+    _topology_response.update(ts=now, version=version, body=orjson.dumps(topology))
+    return Response(content=_topology_response["body"], media_type="application/json")
 
 @router.get("/metrics")
 async def get_system_metrics(
-    adaptive_learner: AdaptiveLearner = Depends(get_adaptive_learner)
+    adaptive_learner: AdaptiveLearner = Depends(get_adaptive_learner),
+    websocket_manager: WebSocketManager = Depends(get_websocket_manager)
 ):
     """Get system performance metrics"""
     metrics = await adaptive_learner.get_performance_report()
+    metrics['connected_clients'] = websocket_manager.connected_count
     return metrics
 
 @router.post("/alerts")
@@ -96,7 +114,7 @@ async def create_threat_alert(
             "status": "processed",
             "actions_taken": coordination_result.get('response_plan', {}).get('infected_agent_commands', []),
             "risk_assessment": coordination_result.get('risk_assessment', {}),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": utc_now_iso()
         }
         
     except Exception as e:
@@ -124,7 +142,7 @@ async def send_agent_commands(
             "status": "commands_sent",
             "agent_id": agent_id,
             "command_count": len(commands),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": utc_now_iso()
         }
         
     except Exception as e:
@@ -145,7 +163,7 @@ async def activate_emergency_protocol(
         return {
             "status": "emergency_activated",
             "incident_id": incident_id,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": utc_now_iso()
         }
         
     except Exception as e:
@@ -164,7 +182,7 @@ async def deactivate_emergency_protocol(
         return {
             "status": "emergency_deactivated",
             "incident_id": incident_id,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": utc_now_iso()
         }
         
     except Exception as e:
@@ -1,24 +1,38 @@
-import json
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+import orjson
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Union
 from fastapi import WebSocket, WebSocketDisconnect
-from datetime import datetime
 
+from config.settings import settings
 from models.schemas import AgentRegistration, ThreatAlert
-from utils.helpers import validate_threat_alert, generate_incident_id
+from utils.helpers import validate_threat_alert, generate_incident_id, utc_now_iso
+
+# Pre-encoded acknowledgements; only the timestamp is spliced in per message
+_HEARTBEAT_ACK_PREFIX = b'{"type":"HEARTBEAT_ACK","timestamp":"'
+_STATUS_ACK_PREFIX = b'{"type":"STATUS_ACK","status":"success","timestamp":"'
+_ALERT_THROTTLED_PREFIX = b'{"type":"ALERT_THROTTLED","status":"suppressed","timestamp":"'
+_ACK_SUFFIX = b'"}'
+
+def _dumps(message: Dict[str, Any]) -> bytes:
+    """Serialize an outgoing websocket message"""
+    return orjson.dumps(message, option=orjson.OPT_NAIVE_UTC)
 
 class WebSocketManager:
     def __init__(self, central_system):
         self.central_system = central_system
         self.logger = logging.getLogger(__name__)
         self.connected_clients: Dict[str, WebSocket] = {}
-        self.message_handlers = {
-            'REGISTER': self._handle_register,
-            'THREAT_ALERT': self._handle_threat_alert,
-            'STATUS_UPDATE': self._handle_status_update,
-            'HEARTBEAT': self._handle_heartbeat,
-            'COMMAND_ACK': self._handle_command_ack
-        }
+        # Per-connection token buckets, least recently used first:
+        # client_id -> (tokens, last_refill, suppressed_count)
+        self._alert_buckets: OrderedDict[str, Tuple[float, float, int]] = OrderedDict()
+
+    @property
+    def connected_count(self) -> int:
+        """Number of currently connected clients"""
+        return len(self.connected_clients)
 
     async def connect_client(self, websocket: WebSocket, client_id: str):
         """Accept WebSocket connection and add to connected clients"""
@@ -30,21 +44,32 @@ class WebSocketManager:
         """Remove client from connected clients"""
         if client_id in self.connected_clients:
             del self.connected_clients[client_id]
+            self._alert_buckets.pop(client_id, None)
             await self.central_system.agent_manager.unregister_agent(client_id)
             self.logger.info(f"Client disconnected: {client_id}")
 
-    async def process_client_message(self, websocket: WebSocket, client_id: str, message: str):
+    async def process_client_message(self, websocket: WebSocket, client_id: str, message: Union[str, bytes]):
         """Process message from client"""
         try:
-            data = json.loads(message)
+            data = orjson.loads(message)
             message_type = data.get('type')
             
-            if message_type in self.message_handlers:
-                await self.message_handlers[message_type](websocket, client_id, data)
-            else:
-                await self._send_error(websocket, f"Unknown message type: {message_type}")
+            # Cases ordered by expected frequency
+            match message_type:
+                case 'HEARTBEAT':
+                    await self._handle_heartbeat(websocket, client_id, data)
+                case 'STATUS_UPDATE':
+                    await self._handle_status_update(websocket, client_id, data)
+                case 'THREAT_ALERT':
+                    await self._handle_threat_alert(websocket, client_id, data)
+                case 'COMMAND_ACK':
+                    await self._handle_command_ack(websocket, client_id, data)
+                case 'REGISTER':
+                    await self._handle_register(websocket, client_id, data)
+                case _:
+                    await self._send_error(websocket, f"Unknown message type: {message_type}")
                 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             await self._send_error(websocket, "Invalid JSON format")
         except Exception as e:
             self.logger.error(f"Error processing message from {client_id}: {e}")
@@ -68,9 +93,9 @@ class WebSocketManager:
                     'type': 'REGISTRATION_ACK',
                     'status': 'success',
                     'message': f'Agent {agent_data.agent_id} registered successfully',
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': utc_now_iso()
                 }
-                await websocket.send_text(json.dumps(response))
+                await websocket.send_bytes(_dumps(response))
                 self.logger.info(f"Agent registered: {agent_data.agent_id}")
             else:
                 await self._send_error(websocket, "Registration failed")
@@ -89,6 +114,13 @@ class WebSocketManager:
                 await self._send_error(websocket, "Invalid threat alert format")
                 return
             
+            # Drop alerts over the per-connection rate before any real work;
+            # the budget belongs to the socket, not to IDs in the payload
+            allowed, suppressed_count = self._take_alert_token(client_id)
+            if not allowed:
+                await websocket.send_bytes(_ALERT_THROTTLED_PREFIX + utc_now_iso().encode('ascii') + _ACK_SUFFIX)
+                return
+            
             # Convert to ThreatAlert schema
             threat_alert = ThreatAlert(**alert_payload)
             threat_alert.incident_id = generate_incident_id()
@@ -105,10 +137,13 @@ class WebSocketManager:
                 'risk_assessment': incident_response.get('risk_assessment', {}),
                 'llm_analysis': incident_response.get('llm_analysis', {}),
                 'correlation_data': incident_response.get('correlation_data', {}),
-                'timestamp': datetime.now().isoformat()
+                'timestamp': utc_now_iso()
             }
+            if suppressed_count:
+                response['repeat_count'] = suppressed_count
+                self.logger.warning(f"{suppressed_count} throttled alerts from {client_id} were suppressed")
             
-            await websocket.send_text(json.dumps(response))
+            await websocket.send_bytes(_dumps(response))
             
             self.logger.info(f"Processed threat alert from {threat_alert.agent_id}")
             
@@ -116,6 +151,34 @@ class WebSocketManager:
             self.logger.error(f"Threat alert processing error for {client_id}: {e}")
             await self._send_error(websocket, f"Alert processing failed: {str(e)}")
 
+    def _take_alert_token(self, client_id: str) -> Tuple[bool, int]:
+        """Token bucket check for a client connection.
+
+        Returns whether the alert may proceed and, when it may, how many
+        alerts from the same connection were suppressed since the last one
+        that got through.
+        """
+        now = time.monotonic()
+        buckets = self._alert_buckets
+        tokens, last_refill, suppressed = buckets.get(
+            client_id, (float(settings.ALERT_BURST), now, 0)
+        )
+        tokens = min(settings.ALERT_BURST, tokens + (now - last_refill) * settings.ALERT_RATE_PER_SECOND)
+        
+        if tokens < 1:
+            buckets[client_id] = (tokens, now, suppressed + 1)
+            allowed, suppressed = False, 0
+        else:
+            buckets[client_id] = (tokens - 1, now, 0)
+            allowed = True
+        
+        # Buckets are dropped on disconnect; the cap evicts the longest idle
+        # ones should disconnects be missed
+        buckets.move_to_end(client_id)
+        while len(buckets) > settings.ALERT_BUCKETS_MAX:
+            buckets.popitem(last=False)
+        return allowed, suppressed
+
     async def _handle_status_update(self, websocket: WebSocket, client_id: str, data: Dict[str, Any]):
         """Handle status update from agent"""
         try:
@@ -127,12 +190,7 @@ class WebSocketManager:
                 update_data
             )
             
-            response = {
-                'type': 'STATUS_ACK',
-                'status': 'success',
-                'timestamp': datetime.now().isoformat()
-            }
-            await websocket.send_text(json.dumps(response))
+            await websocket.send_bytes(_STATUS_ACK_PREFIX + utc_now_iso().encode('ascii') + _ACK_SUFFIX)
             
         except Exception as e:
             self.logger.error(f"Status update error for {client_id}: {e}")
@@ -142,11 +200,7 @@ class WebSocketManager:
         try:
             await self.central_system.agent_manager.update_agent_heartbeat(client_id)
             
-            response = {
-                'type': 'HEARTBEAT_ACK',
-                'timestamp': datetime.now().isoformat()
-            }
-            await websocket.send_text(json.dumps(response))
+            await websocket.send_bytes(_HEARTBEAT_ACK_PREFIX + utc_now_iso().encode('ascii') + _ACK_SUFFIX)
             
         except Exception as e:
             self.logger.error(f"Heartbeat error for {client_id}: {e}")
@@ -168,22 +222,33 @@ class WebSocketManager:
         error_response = {
             'type': 'ERROR',
             'message': error_message,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': utc_now_iso()
         }
-        await websocket.send_text(json.dumps(error_response))
+        await websocket.send_bytes(_dumps(error_response))
 
     async def send_to_agent(self, agent_id: str, message: Dict[str, Any]):
         """Send message to specific agent"""
-        if agent_id in self.connected_clients:
+        await self._send_bytes(agent_id, _dumps(message))
+
+    async def _send_bytes(self, agent_id: str, payload: bytes):
+        """Send an already serialized message to a specific agent"""
+        websocket = self.connected_clients.get(agent_id)
+        if websocket is not None:
             try:
-                await self.connected_clients[agent_id].send_text(json.dumps(message))
+                await websocket.send_bytes(payload)
             except Exception as e:
                 self.logger.error(f"Error sending to agent {agent_id}: {e}")
                 await self.disconnect_client(agent_id)
 
     async def broadcast_to_agents(self, message: Dict[str, Any], agent_ids: list = None):
         """Broadcast message to multiple agents"""
-        targets = agent_ids if agent_ids else list(self.connected_clients.keys())
+        # Serialize once for all recipients and let the sends overlap
+        payload = _dumps(message)
+        if agent_ids:
+            await asyncio.gather(*(self._send_bytes(agent_id, payload) for agent_id in agent_ids))
+            return
         
-        for agent_id in targets:
-            await self.send_to_agent(agent_id, message)
\ No newline at end of file
+        # Snapshot the clients so disconnects during the sends are safe
+        await asyncio.gather(*(
+            self._send_bytes(agent_id, payload) for agent_id in tuple(self.connected_clients)
+        ))
\ No newline at end of file
@@ -1,51 +1,76 @@
 import os
-from typing import Dict, Any, List
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, List, Mapping, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Directory of the central_system package, for default paths of generated files
+_CENTRAL_SYSTEM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@dataclass(frozen=True, slots=True)
 class Settings:
     """Central system configuration for NetMoniAI-Ransom"""
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "logs/central_system.log"
+    DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
+    TEMPLATE_CACHE_DIR: str = os.path.abspath(
+        os.getenv("TEMPLATE_CACHE_DIR", os.path.join(_CENTRAL_SYSTEM_DIR, ".jinja_cache"))
+    )
+    CONSOLE_ASSET_DIR: str = os.path.abspath(
+        os.getenv("CONSOLE_ASSET_DIR", os.path.join(_CENTRAL_SYSTEM_DIR, ".console_assets"))
+    )
+    ADMIN_CACHE_TTL: float = float(os.getenv("ADMIN_CACHE_TTL", "3"))
 
     # Server Configuration
-    SERVER_HOST = os.getenv("CENTRAL_SERVER_HOST", "0.0.0.0")
-    SERVER_PORT = int(os.getenv("CENTRAL_SERVER_PORT", "8765"))
-    WEBSOCKET_TIMEOUT = int(os.getenv("WEBSOCKET_TIMEOUT", "30"))
+    SERVER_HOST: str = os.getenv("CENTRAL_SERVER_HOST", "0.0.0.0")
+    SERVER_PORT: int = int(os.getenv("CENTRAL_SERVER_PORT", "8765"))
+    WEBSOCKET_TIMEOUT: int = int(os.getenv("WEBSOCKET_TIMEOUT", "30"))
     
     # Database Configuration
-    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///central_intelligence.db")
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///central_intelligence.db")
     
     # Multi-LLM Configuration with fallback
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-    LOCAL_LLM_URL = os.getenv("LOCAL_LLM_URL", "http://localhost:11434")
+    GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+    LOCAL_LLM_URL: str = os.getenv("LOCAL_LLM_URL", "http://localhost:11434")
     
     # Fallback order — you can override via .env (e.g., "gemini,openai,local")
-    LLM_FALLBACK_ORDER = os.getenv("LLM_FALLBACK_ORDER", "gemini,openai,local").split(",")
+    LLM_FALLBACK_ORDER: Tuple[str, ...] = tuple(os.getenv("LLM_FALLBACK_ORDER", "gemini,openai,local").split(","))
+    LLM_CACHE_TTL: float = float(os.getenv("LLM_CACHE_TTL", "300"))
     
     # Security Configuration
-    AGENT_AUTH_TOKEN = os.getenv("AGENT_AUTH_TOKEN", "default-secret-token")
-    ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY", "default-encryption-key")
+    AGENT_AUTH_TOKEN: str = os.getenv("AGENT_AUTH_TOKEN", "default-secret-token")
+    ENCRYPTION_KEY: str = os.getenv("ENCRYPTION_KEY", "default-encryption-key")
     
     # Response Configuration
-    EMERGENCY_MODE_DURATION = int(os.getenv("EMERGENCY_MODE_DURATION", "3600"))
-    HEARTBEAT_INTERVAL = int(os.getenv("HEARTBEAT_INTERVAL", "30"))
+    EMERGENCY_MODE_DURATION: int = int(os.getenv("EMERGENCY_MODE_DURATION", "3600"))
+    HEARTBEAT_INTERVAL: int = int(os.getenv("HEARTBEAT_INTERVAL", "30"))
+    BROADCAST_SEND_TIMEOUT: float = float(os.getenv("BROADCAST_SEND_TIMEOUT", "2.0"))
+    ALERT_RATE_PER_SECOND: float = float(os.getenv("ALERT_RATE_PER_SECOND", "5"))
+    ALERT_BURST: int = int(os.getenv("ALERT_BURST", "10"))
+    ALERT_BUCKETS_MAX: int = int(os.getenv("ALERT_BUCKETS_MAX", "4096"))
     
     # Threat Assessment Thresholds
-    CRITICAL_THRESHOLD = float(os.getenv("CRITICAL_THRESHOLD", "8.0"))
-    HIGH_THRESHOLD = float(os.getenv("HIGH_THRESHOLD", "6.0"))
-    MEDIUM_THRESHOLD = float(os.getenv("MEDIUM_THRESHOLD", "4.0"))
+    CRITICAL_THRESHOLD: float = float(os.getenv("CRITICAL_THRESHOLD", "8.0"))
+    HIGH_THRESHOLD: float = float(os.getenv("HIGH_THRESHOLD", "6.0"))
+    MEDIUM_THRESHOLD: float = float(os.getenv("MEDIUM_THRESHOLD", "4.0"))
 
-    def get_llm_config(self) -> Dict[str, Any]:
-        """Return LLM configuration for LLMIntelligence class"""
-        return {
+    _llm_config: Mapping[str, Any] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Built once; the mapping is read-only so it can be shared freely
+        object.__setattr__(self, "_llm_config", MappingProxyType({
             "gemini_api_key": self.GEMINI_API_KEY,
             "openai_api_key": self.OPENAI_API_KEY,
             "local_llm_url": self.LOCAL_LLM_URL,
             "fallback_order": self.LLM_FALLBACK_ORDER,
-        }
+        }))
+
+    def get_llm_config(self) -> Mapping[str, Any]:
+        """Return LLM configuration for LLMIntelligence class"""
+        return self._llm_config
 
 # Global settings instance
 settings = Settings()
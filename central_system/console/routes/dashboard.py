@@ -1,188 +1,520 @@
 from aiohttp import web
-import json
+import asyncio
+import functools
+import gzip
+import hashlib
 import logging
+import orjson
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime
+from html import escape
+from itertools import islice
+from multidict import CIMultiDict, CIMultiDictProxy
+from pathlib import Path
 from typing import Dict, List, Any
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rcssmin
+    import rjsmin
+except ImportError:
+    rcssmin = rjsmin = None
+
+from config.settings import settings
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / 'static'
+
+# Whole-line console.log statements are debugging noise in the shipped script
+_CONSOLE_LOG_LINE = re.compile(r'^[ \t]*console\.log\(.*\);[ \t]*\n', re.MULTILINE)
+
+# Hashed asset names change with their content, so they never need revalidating
+_IMMUTABLE_ASSET_HEADERS = CIMultiDictProxy(CIMultiDict({'Cache-Control': 'public, max-age=31536000, immutable'}))
+
+# Response headers built once and shared by every response
+_JSON_HEADERS = CIMultiDictProxy(CIMultiDict({'Content-Type': 'application/json'}))
+_HTML_FRAGMENT_HEADERS = CIMultiDictProxy(CIMultiDict({'Content-Type': 'text/html; charset=utf-8'}))
+
+# JSON bodies at least this large are compressed for clients that accept it
+COMPRESS_MIN_BYTES = 1024
+
+def _json_bytes(body: bytes, status: int = 200) -> web.Response:
+    """Response for an already encoded JSON body"""
+    response = web.Response(body=body, status=status, headers=_JSON_HEADERS)
+    if len(body) >= COMPRESS_MIN_BYTES:
+        response.enable_compression()
+    return response
+
+def _json(payload: Any, status: int = 200) -> web.Response:
+    """JSON response encoded with orjson"""
+    return _json_bytes(orjson.dumps(payload), status)
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    """Content codings allowed by an Accept-Encoding header; q=0 refuses one"""
+    accepted, refused = set(), set()
+    for item in accept_encoding.lower().split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        (accepted if q > 0 else refused).add(coding)
+    if '*' in accepted:
+        accepted.update(coding for coding in ('br', 'gzip') if coding not in refused)
+    return accepted
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
+
+# Startup log lines seeded into the buffer; the start timestamp is prefixed to each
+_LOG_TEMPLATES = (
+    " - INFO - Dashboard overview API called",
+    " - INFO - Agents API called",
+    " - INFO - Incidents API called",
+    " - INFO - Logs API called",
+    " - INFO - Central system started successfully",
+    " - INFO - WebSocket server running on port 8765",
+    " - INFO - Admin console started on port 8767",
+    " - WARNING - No agents connected yet",
+    " - INFO - System ready to receive connections"
+)
+
+# Sample API data, encoded once at import (orjson serializes the row
+# dataclasses natively). The "__LAST_SEEN__" and "__NOW__" sentinels are
+# replaced with the request time at the byte level.
+_SAMPLE_OVERVIEW = {
+    'system_health': {
+        'status': 'healthy',
+        'uptime': '24h'
+    },
+    'metrics': {
+        'containment_success_rate': 0.95,
+        'average_response_time_seconds': 2.5,
+        'false_positives': 0,
+        'true_positives': 5
+    },
+    'topology': {
+        'total_agents': 3,
+        'online_agents': 2,
+        'connected_agents': 2
+    },
+    'active_incidents': {
+        'total': 2,
+        'critical': 1,
+        'emergencies': 0
+    }
+}
+
+@dataclass(frozen=True, slots=True)
+class AgentRow:
+    """Agent entry returned by /api/agents"""
+    agent_id: str
+    hostname: str
+    ip_address: str
+    os_type: str
+    status: str
+    connected: bool
+    last_seen: str
+
+@dataclass(frozen=True, slots=True)
+class IncidentRow:
+    """Incident entry returned by /api/incidents"""
+    incident_id: str
+    agent_id: str
+    timestamp: str
+    threat_level: str
+    malware_process: str
+    detection_confidence: float
+    status: str
+
+_SAMPLE_AGENTS = (
+    AgentRow(
+        agent_id='PC-A',
+        hostname='pc-a.local',
+        ip_address='192.168.1.10',
+        os_type='Windows 11',
+        status='online',
+        connected=True,
+        last_seen='__LAST_SEEN__'
+    ),
+    AgentRow(
+        agent_id='PC-B',
+        hostname='pc-b.local',
+        ip_address='192.168.1.11',
+        os_type='Windows 10',
+        status='online',
+        connected=True,
+        last_seen='__LAST_SEEN__'
+    ),
+    AgentRow(
+        agent_id='PC-C',
+        hostname='pc-c.local',
+        ip_address='192.168.1.12',
+        os_type='Linux',
+        status='offline',
+        connected=False,
+        last_seen='2024-01-15T10:00:00Z'
+    )
+)
+
+_SAMPLE_INCIDENTS = (
+    IncidentRow(
+        incident_id='INC_20240115_140500_abc123',
+        agent_id='PC-A',
+        timestamp='__NOW__',
+        threat_level='critical',
+        malware_process='crypto_stealth.exe',
+        detection_confidence=0.92,
+        status='contained'
+    ),
+    IncidentRow(
+        incident_id='INC_20240115_120000_def456',
+        agent_id='PC-B',
+        timestamp='2024-01-15T12:00:00Z',
+        threat_level='medium',
+        malware_process='suspicious_script.js',
+        detection_confidence=0.65,
+        status='investigating'
+    )
+)
+
+_OVERVIEW_BYTES = orjson.dumps(_SAMPLE_OVERVIEW)
+_AGENTS_TEMPLATE = orjson.dumps({
+    'agents': _SAMPLE_AGENTS,
+    'total_count': len(_SAMPLE_AGENTS),
+    'connected_count': sum(1 for a in _SAMPLE_AGENTS if a.connected)
+})
+_INCIDENTS_TEMPLATE = orjson.dumps({
+    'incidents': _SAMPLE_INCIDENTS,
+    'total': len(_SAMPLE_INCIDENTS)
+})
+
+# Server-rendered incidents table used by the Incidents tab
+_INCIDENT_TABLE_HEAD = (
+    '<table class="table"><thead><tr>'
+    '<th>Incident ID</th><th>Time</th><th>Agent</th><th>Threat</th>'
+    '<th>Level</th><th>Confidence</th><th>Status</th>'
+    '</tr></thead><tbody>'
+)
+_INCIDENT_TABLE_TAIL = '</tbody></table>'
+_INCIDENT_ROW_TMPL = (
+    '<tr><td><small>{incident_id}</small></td><td>{time}</td><td>{agent_id}</td>'
+    '<td>{malware_process}</td><td><span class="badge badge-{threat_level}">{threat_level}</span></td>'
+    '<td>{confidence}%</td><td>{status}</td></tr>'
+)
+
+def _render_incident_row(incident: IncidentRow, now: str) -> str:
+    """Render one incident as an escaped table row"""
+    timestamp = now if incident.timestamp == '__NOW__' else incident.timestamp
+    return _INCIDENT_ROW_TMPL.format(
+        incident_id=escape(incident.incident_id),
+        time=escape(timestamp[:19].replace('T', ' ')),
+        agent_id=escape(incident.agent_id),
+        malware_process=escape(incident.malware_process or 'Unknown'),
+        threat_level=escape(incident.threat_level),
+        confidence=round((incident.detection_confidence or 0) * 100),
+        status=escape(incident.status or 'unknown')
+    )
+
+LOG_BUFFER_SIZE = 10000
+
+# Upper bounds for client-supplied query parameters
+MAX_LOG_LINES = 1000
+MAX_INCIDENT_HOURS = 168
+
+# /api/logs responses are reused for up to this many seconds
+LOGS_CACHE_SECONDS = 5
+
+class _LevelPartitionedLogHandler(logging.Handler):
+    """Keeps recent log lines partitioned by level, plus an 'ALL' stream"""
+
+    def __init__(self, maxlen: int = LOG_BUFFER_SIZE):
+        super().__init__()
+        self.maxlen = maxlen
+        self.logs_by_level: Dict[str, deque] = {
+            level: deque(maxlen=maxlen) for level in ('ALL', 'CRITICAL', 'ERROR', 'WARNING', 'INFO', 'DEBUG')
+        }
+
+    def append(self, level: str, line: str):
+        self.logs_by_level['ALL'].append(line)
+        bucket = self.logs_by_level.get(level)
+        if bucket is None:
+            bucket = self.logs_by_level[level] = deque(maxlen=self.maxlen)
+        bucket.append(line)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            timestamp = datetime.fromtimestamp(record.created).isoformat()
+            self.append(record.levelname, f"{timestamp} - {record.levelname} - {record.getMessage()}")
+        except Exception:
+            self.handleError(record)
+
+    def tail(self, level: str, lines: int) -> List[str]:
+        """Last `lines` entries for a level (oldest first); unknown levels read 'ALL'"""
+        source = self.logs_by_level.get(level, self.logs_by_level['ALL'])
+        tail = list(islice(reversed(source), lines))
+        tail.reverse()
+        return tail
+
+# Application logger whose records /api/logs serves; the console logs under it
+# so its own lines are included, while other libraries' records are not
+APP_LOGGER_NAME = "central_system"
+
+# Shared across DashboardRoutes instances so the application logger gets one handler
+_log_buffer = _LevelPartitionedLogHandler()
+
+@functools.lru_cache(maxsize=64)
+def _logs_payload(level: str, lines: int, tick: int) -> bytes:
+    """Encoded /api/logs body; `tick` expires the entry every LOGS_CACHE_SECONDS"""
+    logs = _log_buffer.tail(level, lines)
+    return orjson.dumps({
+        'logs': logs,
+        'total_lines': len(logs)
+    })
+
 class DashboardRoutes:
     def __init__(self, central_system):
         self.central_system = central_system
-        self.logger = logging.getLogger(__name__)
+        self.logger = logging.getLogger(f"{APP_LOGGER_NAME}.console")
+        # The page is static, so split out its assets, encode it and hash it
+        # once for the ETags
+        self._asset_dir = Path(settings.CONSOLE_ASSET_DIR)
+        self._asset_dir.mkdir(parents=True, exist_ok=True)
+        self._assets: Dict[str, Path] = {}
+        self._dashboard_html_bytes = self._externalize_assets(self._get_dashboard_html()).encode('utf-8')
+        self._dashboard_digest = hashlib.md5(self._dashboard_html_bytes).hexdigest()
+        # Written to the asset directory once so aiohttp can serve it with sendfile
+        self._dashboard_path = self._asset_dir / 'index.html'
+        self._dashboard_path.write_bytes(self._dashboard_html_bytes)
+        # Precompressed variants for clients that accept them
+        self._dashboard_br = brotli.compress(self._dashboard_html_bytes, quality=11) if brotli else None
+        self._dashboard_gzip = gzip.compress(self._dashboard_html_bytes, compresslevel=9)
+        self._build_dashboard_headers()
+        self._install_log_buffer()
         self.routes = web.RouteTableDef()
         self._setup_routes()
 
+    def _externalize_assets(self, html: str) -> str:
+        """Move the inline CSS and JS into content-hashed static files.
+
+        The hashed names change whenever the content does, so the files can
+        be served with an immutable cache policy and only the small HTML
+        shell is refetched. The assets are minified first when rcssmin and
+        rjsmin are installed.
+        """
+        head, _, rest = html.partition('<style>')
+        css, _, rest = rest.partition('</style>')
+        body, _, rest = rest.partition('<script>')
+        js, _, tail = rest.partition('</script>')
+        
+        js = _CONSOLE_LOG_LINE.sub('', js)
+        if rcssmin is not None:
+            css = rcssmin.cssmin(css)
+            js = rjsmin.jsmin(js)
+        
+        css_name = self._write_asset(css, 'css')
+        js_name = self._write_asset(js, 'js')
+        self._remove_stale_assets()
+        return (
+            f'{head}<link rel="stylesheet" href="/assets/{css_name}">'
+            f'{body}<script src="/assets/{js_name}"></script>{tail}'
+        )
+
+    def _write_asset(self, content: str, extension: str) -> str:
+        """Write an asset under a content-hashed name and register it"""
+        data = content.encode('utf-8')
+        name = f"dashboard.{hashlib.md5(data).hexdigest()[:8]}.{extension}"
+        path = self._asset_dir / name
+        if not path.exists():
+            path.write_bytes(data)
+        self._assets[name] = path
+        return name
+
+    def _remove_stale_assets(self):
+        """Delete hashed assets left behind by earlier versions of the page"""
+        for path in self._asset_dir.glob('dashboard.*.*'):
+            if path.name not in self._assets:
+                path.unlink(missing_ok=True)
+
+    def _build_dashboard_headers(self):
+        """Build the header sets of each dashboard page representation.
+
+        Every encoding is a separate representation, so each gets its own
+        strong ETag. FileResponse sets and checks the ETag of the
+        uncompressed file itself.
+        """
+        page_headers = {
+            'Content-Type': 'text/html; charset=utf-8',
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': 'public, max-age=3600'
+        }
+        self._dashboard_headers = CIMultiDictProxy(CIMultiDict(page_headers))
+        # encoding -> (body, etag, headers, 304 headers), in order of preference
+        self._dashboard_encoded = {}
+        for encoding, body in (('br', self._dashboard_br), ('gzip', self._dashboard_gzip)):
+            if body is None:
+                continue
+            etag = f'"{self._dashboard_digest}-{encoding}"'
+            self._dashboard_encoded[encoding] = (
+                body,
+                etag,
+                CIMultiDictProxy(CIMultiDict(page_headers, **{'ETag': etag, 'Content-Encoding': encoding})),
+                CIMultiDictProxy(CIMultiDict({
+                    'ETag': etag,
+                    'Vary': 'Accept-Encoding',
+                    'Cache-Control': page_headers['Cache-Control']
+                }))
+            )
+
+    def _install_log_buffer(self):
+        """Attach the shared log buffer to the application logger and seed it once"""
+        app_logger = logging.getLogger(APP_LOGGER_NAME)
+        if _log_buffer in app_logger.handlers:
+            return
+        ts = datetime.now().isoformat()
+        for line in _LOG_TEMPLATES:
+            _log_buffer.append(line.split(' - ')[1], ts + line)
+        app_logger.addHandler(_log_buffer)
+
     def _setup_routes(self):
         """Setup dashboard routes"""
+        # Handlers close over the logger instead of reading self.logger per call
+        logger = self.logger
+        
+        # Packaged static files are served read-only; generated assets live in
+        # the asset directory and are served from /assets
+        self.routes.static('/static', STATIC_DIR)
         
+        @self.routes.get('/assets/{name}')
+        async def dashboard_asset(request):
+            """Serve a content-hashed dashboard asset"""
+            path = self._assets.get(request.match_info['name'])
+            if path is None:
+                raise web.HTTPNotFound()
+            return web.FileResponse(path, headers=_IMMUTABLE_ASSET_HEADERS)
+
         @self.routes.get('/')
         async def dashboard(request):
             """Serve the main dashboard page"""
-            self.logger.info("📊 Dashboard page requested")
-            return web.Response(
-                text=self._get_dashboard_html(),
-                content_type='text/html'
-            )
+            logger.info("📊 Dashboard page requested")
+            accepted = _accepted_encodings(request.headers.get('Accept-Encoding', ''))
+            for encoding, (body, etag, headers, not_modified_headers) in self._dashboard_encoded.items():
+                if encoding in accepted:
+                    if _etag_matches(request.headers.get('If-None-Match', ''), etag):
+                        return web.Response(status=304, headers=not_modified_headers)
+                    return web.Response(body=body, headers=headers)
+            return web.FileResponse(self._dashboard_path, headers=self._dashboard_headers)
 
         @self.routes.get('/api/dashboard/overview')
         async def get_overview(request):
             """Get dashboard overview data"""
-            self.logger.info("📈 Dashboard overview API called")
+            logger.info("📈 Dashboard overview API called")
             try:
-                metrics = {
-                    'system_health': {
-                        'status': 'healthy',
-                        'uptime': '24h'
-                    },
-                    'metrics': {
-                        'containment_success_rate': 0.95,
-                        'average_response_time_seconds': 2.5,
-                        'false_positives': 0,
-                        'true_positives': 5
-                    },
-                    'topology': {
-                        'total_agents': 3,
-                        'online_agents': 2,
-                        'connected_agents': 2
-                    },
-                    'active_incidents': {
-                        'total': 2,
-                        'critical': 1,
-                        'emergencies': 0
-                    }
-                }
-                
-                self.logger.info(f"✅ Dashboard overview returned: {metrics}")
-                return web.json_response(metrics)
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("✅ Dashboard overview returned: %s", _SAMPLE_OVERVIEW)
+                return _json_bytes(_OVERVIEW_BYTES)
                 
             except Exception as e:
-                self.logger.error(f"❌ Dashboard overview error: {e}")
-                return web.json_response({'error': str(e)}, status=500)
+                logger.error("❌ Dashboard overview error: %s", e)
+                return _json({'error': str(e)}, status=500)
 
         @self.routes.get('/api/agents')
         async def get_agents_list(request):
             """Get detailed agents list"""
-            self.logger.info("👥 Agents API called")
+            logger.info("👥 Agents API called")
             try:
-                # Sample agent data
-                agents = [
-                    {
-                        'agent_id': 'PC-A',
-                        'hostname': 'pc-a.local',
-                        'ip_address': '192.168.1.10',
-                        'os_type': 'Windows 11',
-                        'status': 'online',
-                        'connected': True,
-                        'last_seen': datetime.now().isoformat()
-                    },
-                    {
-                        'agent_id': 'PC-B', 
-                        'hostname': 'pc-b.local',
-                        'ip_address': '192.168.1.11',
-                        'os_type': 'Windows 10',
-                        'status': 'online',
-                        'connected': True,
-                        'last_seen': datetime.now().isoformat()
-                    },
-                    {
-                        'agent_id': 'PC-C',
-                        'hostname': 'pc-c.local',
-                        'ip_address': '192.168.1.12',
-                        'os_type': 'Linux',
-                        'status': 'offline',
-                        'connected': False,
-                        'last_seen': '2024-01-15T10:00:00Z'
-                    }
-                ]
+                now = datetime.now().isoformat().encode()
+                body = _AGENTS_TEMPLATE.replace(b'"__LAST_SEEN__"', b'"' + now + b'"')
                 
-                self.logger.info(f"✅ Agents returned: {len(agents)} agents")
-                return web.json_response({
-                    'agents': agents,
-                    'total_count': len(agents),
-                    'connected_count': len([a for a in agents if a['connected']])
-                })
+                logger.info("✅ Agents returned: %s agents", len(_SAMPLE_AGENTS))
+                return _json_bytes(body)
                 
             except Exception as e:
-                self.logger.error(f"❌ Agents error: {e}")
-                return web.json_response({'error': str(e)}, status=500)
+                logger.error("❌ Agents error: %s", e)
+                return _json({'error': str(e)}, status=500)
 
         @self.routes.get('/api/incidents')
         async def get_incidents_list(request):
             """Get incidents with filtering"""
-            self.logger.info("🚨 Incidents API called")
+            logger.info("🚨 Incidents API called")
             try:
-                hours = request.query.get('hours', '24')
-                self.logger.info(f"📅 Incidents filter - hours: {hours}")
+                try:
+                    hours = max(1, min(MAX_INCIDENT_HOURS, int(request.query.get('hours', '24'))))
+                except ValueError:
+                    return _json({'error': 'hours must be an integer'}, status=400)
+                logger.info("📅 Incidents filter - hours: %s", hours)
                 
-                # Sample incident data
-                incidents = [
-                    {
-                        'incident_id': 'INC_20240115_140500_abc123',
-                        'agent_id': 'PC-A',
-                        'timestamp': datetime.now().isoformat(),
-                        'threat_level': 'critical',
-                        'malware_process': 'crypto_stealth.exe',
-                        'detection_confidence': 0.92,
-                        'status': 'contained'
-                    },
-                    {
-                        'incident_id': 'INC_20240115_120000_def456',
-                        'agent_id': 'PC-B',
-                        'timestamp': '2024-01-15T12:00:00Z',
-                        'threat_level': 'medium',
-                        'malware_process': 'suspicious_script.js',
-                        'detection_confidence': 0.65,
-                        'status': 'investigating'
-                    }
-                ]
+                now = datetime.now().isoformat().encode()
+                body = _INCIDENTS_TEMPLATE.replace(b'"__NOW__"', b'"' + now + b'"')
                 
-                self.logger.info(f"✅ Incidents returned: {len(incidents)} incidents")
-                return web.json_response({
-                    'incidents': incidents,
-                    'total': len(incidents)
-                })
+                logger.info("✅ Incidents returned: %s incidents", len(_SAMPLE_INCIDENTS))
+                return _json_bytes(body)
                 
             except Exception as e:
-                self.logger.error(f"❌ Incidents error: {e}")
-                return web.json_response({'error': str(e)}, status=500)
+                logger.error("❌ Incidents error: %s", e)
+                return _json({'error': str(e)}, status=500)
+
+        @self.routes.get('/api/incidents/html')
+        async def get_incidents_table(request):
+            """Get the incidents table as a ready-to-insert HTML fragment"""
+            logger.info("🚨 Incidents table requested")
+            try:
+                try:
+                    hours = max(1, min(MAX_INCIDENT_HOURS, int(request.query.get('hours', '24'))))
+                except ValueError:
+                    return _json({'error': 'hours must be an integer'}, status=400)
+                logger.info("📅 Incidents table filter - hours: %s", hours)
+                
+                now = datetime.now().isoformat()
+                rows = ''.join(_render_incident_row(incident, now) for incident in _SAMPLE_INCIDENTS)
+                return web.Response(
+                    body=(_INCIDENT_TABLE_HEAD + rows + _INCIDENT_TABLE_TAIL).encode('utf-8'),
+                    headers=_HTML_FRAGMENT_HEADERS
+                )
+                
+            except Exception as e:
+                logger.error("❌ Incidents table error: %s", e)
+                return _json({'error': str(e)}, status=500)
 
         @self.routes.get('/api/logs')
         async def get_system_logs(request):
             """Get system logs with filtering"""
-            self.logger.info("📋 Logs API called")
+            logger.info("📋 Logs API called")
             try:
-                lines = int(request.query.get('lines', '50'))
+                try:
+                    lines = max(1, min(MAX_LOG_LINES, int(request.query.get('lines', '50'))))
+                except ValueError:
+                    return _json({'error': 'lines must be an integer'}, status=400)
                 level = request.query.get('level', '')
-                self.logger.info(f"📝 Logs filter - lines: {lines}, level: {level}")
-                
-                # Sample logs with timestamps
-                logs = [
-                    f"{datetime.now().isoformat()} - INFO - Dashboard overview API called",
-                    f"{datetime.now().isoformat()} - INFO - Agents API called", 
-                    f"{datetime.now().isoformat()} - INFO - Incidents API called",
-                    f"{datetime.now().isoformat()} - INFO - Logs API called",
-                    f"{datetime.now().isoformat()} - INFO - Central system started successfully",
-                    f"{datetime.now().isoformat()} - INFO - WebSocket server running on port 8765",
-                    f"{datetime.now().isoformat()} - INFO - Admin console started on port 8767",
-                    f"{datetime.now().isoformat()} - WARNING - No agents connected yet",
-                    f"{datetime.now().isoformat()} - INFO - System ready to receive connections"
-                ]
-                
-                # Filter by level if specified
-                if level:
-                    logs = [log for log in logs if level.upper() in log]
+                logger.info("📝 Logs filter - lines: %s, level: %s", lines, level)
                 
-                # Limit to requested number of lines
-                logs = logs[-lines:]
+                # Level lookup picks the partition; the tail is bounded by `lines`
+                body = _logs_payload(level.upper() or 'ALL', lines, int(time.monotonic() // LOGS_CACHE_SECONDS))
                 
-                self.logger.info(f"✅ Logs returned: {len(logs)} lines")
-                return web.json_response({
-                    'logs': logs,
-                    'total_lines': len(logs)
-                })
+                logger.info("✅ Logs returned: %s bytes", len(body))
+                return _json_bytes(body)
                 
             except Exception as e:
-                self.logger.error(f"❌ Logs error: {e}")
-                return web.json_response({'error': str(e)}, status=500)
+                logger.error("❌ Logs error: %s", e)
+                return _json({'error': str(e)}, status=500)
 
     def _get_dashboard_html(self):
         """Return the dashboard HTML content"""
@@ -509,7 +841,13 @@ class DashboardRoutes:
             }
 
             document.getElementById('dashboard-status').textContent = 'Dashboard loaded successfully';
+            renderOverview(data);
 
+            // Load recent incidents
+            await loadRecentIncidents();
+        }
+
+        function renderOverview(data) {
             // System Health
             document.getElementById('system-health').innerHTML = `
                 <div class="stat-card">
@@ -561,9 +899,6 @@ class DashboardRoutes:
                     <div class="stat-label">Connected Now</div>
                 </div>
             `;
-
-            // Load recent incidents
-            await loadRecentIncidents();
         }
 
         async function loadRecentIncidents() {
@@ -655,43 +990,17 @@ class DashboardRoutes:
             console.log("🚨 Loading all incidents...");
             document.getElementById('incidents-list').innerHTML = '<div class="loading">Loading incidents...</div>';
             
-            const data = await apiCall('/incidents?hours=24');
-            
-            if (!data || !data.incidents) {
+            // The table is rendered server-side; insert the fragment as-is
+            try {
+                const response = await fetch('/api/incidents/html?hours=24');
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+                }
+                document.getElementById('incidents-list').innerHTML = await response.text();
+            } catch (error) {
+                console.error('❌ Incidents table error:', error);
                 document.getElementById('incidents-list').innerHTML = '<div class="error">No incidents found</div>';
-                return;
             }
-
-            const html = `
-                <table class="table">
-                    <thead>
-                        <tr>
-                            <th>Incident ID</th>
-                            <th>Time</th>
-                            <th>Agent</th>
-                            <th>Threat</th>
-                            <th>Level</th>
-                            <th>Confidence</th>
-                            <th>Status</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        ${data.incidents.map(incident => `
-                            <tr>
-                                <td><small>${incident.incident_id}</small></td>
-                                <td>${new Date(incident.timestamp).toLocaleString()}</td>
-                                <td>${incident.agent_id}</td>
-                                <td>${incident.malware_process || 'Unknown'}</td>
-                                <td><span class="badge badge-${incident.threat_level}">${incident.threat_level}</span></td>
-                                <td>${Math.round((incident.detection_confidence || 0) * 100)}%</td>
-                                <td>${incident.status || 'unknown'}</td>
-                            </tr>
-                        `).join('')}
-                    </tbody>
-                </table>
-            `;
-
-            document.getElementById('incidents-list').innerHTML = html;
         }
 
         async function loadLogs() {
@@ -773,4 +1082,17 @@ class DashboardRoutes:
         """
 
     def get_routes(self):
-        return self.routes
\ No newline at end of file
+        return self.routes
+
+if __name__ == "__main__":
+    # Standalone console; uvloop is installed here rather than on import so
+    # applications embedding these routes keep their own event loop policy
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
+    console_app = web.Application()
+    console_app.add_routes(DashboardRoutes(None).get_routes())
+    web.run_app(console_app, port=8767)
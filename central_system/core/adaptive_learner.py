@@ -1,10 +1,140 @@
 import logging
-import json
-from typing import Dict, List, Any, Optional
+import sys
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
+from types import MappingProxyType
 from models.database import DatabaseManager
+from utils.helpers import to_epoch
+
+# Number of recent response times averaged in the performance report
+RESPONSE_TIME_WINDOW = 100
+
+# Most recently updated signatures kept per threat signature category
+MAX_SIGNATURES_PER_CATEGORY = 1000
+
+# Response playbooks; each instance's knowledge base starts from a copy
+_RANSOMWARE_PLAYBOOK = MappingProxyType({
+    'immediate_actions': (
+        'isolate_network',
+        'kill_malicious_process',
+        'lock_file_system',
+        'trigger_emergency_backup'
+    ),
+    'containment_actions': (
+        'block_smb_sharing',
+        'disable_remote_services',
+        'enable_file_protection',
+        'alert_security_team'
+    ),
+    'recovery_actions': (
+        'restore_from_backup',
+        'scan_for_persistence',
+        'validate_system_integrity',
+        'update_security_policies'
+    ),
+    'prevention_enhancements': (
+        'enhance_file_monitoring',
+        'strict_process_whitelisting',
+        'network_segmentation',
+        'backup_verification'
+    )
+})
+
+_TROJAN_PLAYBOOK = MappingProxyType({
+    'immediate_actions': (
+        'isolate_system',
+        'terminate_suspicious_processes',
+        'block_outbound_connections',
+        'collect_forensic_data'
+    ),
+    'containment_actions': (
+        'enable_process_monitoring',
+        'scan_for_persistence',
+        'check_network_connections',
+        'analyze_startup_items'
+    ),
+    'recovery_actions': (
+        'remove_malicious_files',
+        'clean_registry_entries',
+        'update_security_software',
+        'system_integrity_check'
+    ),
+    'prevention_enhancements': (
+        'enhance_execution_control',
+        'application_whitelisting',
+        'network_traffic_analysis',
+        'user_behavior_monitoring'
+    )
+})
+
+_WORM_PLAYBOOK = MappingProxyType({
+    'immediate_actions': (
+        'network_wide_alert',
+        'block_lateral_movement',
+        'isolate_infected_segments',
+        'enable_aggressive_monitoring'
+    ),
+    'containment_actions': (
+        'patch_vulnerabilities',
+        'update_security_rules',
+        'monitor_network_traffic',
+        'scan_all_systems'
+    ),
+    'recovery_actions': (
+        'clean_infected_systems',
+        'validate_network_security',
+        'update_access_controls',
+        'security_policy_review'
+    ),
+    'prevention_enhancements': (
+        'vulnerability_management',
+        'network_segmentation',
+        'intrusion_detection_rules',
+        'regular_security_assessments'
+    )
+})
+
+_MINER_PLAYBOOK = MappingProxyType({
+    'immediate_actions': (
+        'kill_mining_processes',
+        'block_mining_pool_ips',
+        'reduce_system_load',
+        'analyze_resource_usage'
+    ),
+    'containment_actions': (
+        'monitor_cpu_usage',
+        'block_suspicious_ports',
+        'scan_for_mining_software',
+        'check_system_performance'
+    ),
+    'recovery_actions': (
+        'remove_mining_software',
+        'clean_system_files',
+        'optimize_performance',
+        'update_resource_monitoring'
+    ),
+    'prevention_enhancements': (
+        'resource_usage_monitoring',
+        'network_traffic_analysis',
+        'process_behavior_analysis',
+        'system_performance_baselines'
+    )
+})
+
+_BASE_PLAYBOOKS = MappingProxyType({
+    'ransomware': _RANSOMWARE_PLAYBOOK,
+    'trojan': _TROJAN_PLAYBOOK,
+    'worm': _WORM_PLAYBOOK,
+    'miner': _MINER_PLAYBOOK
+})
 
 class AdaptiveLearner:
+    __slots__ = (
+        'db', 'logger', 'knowledge_base', 'performance_metrics',
+        '_response_times', '_response_time_sum', '_response_cache'
+    )
+
     def __init__(self, db: DatabaseManager):
         self.db = db
         self.logger = logging.getLogger(__name__)
@@ -12,24 +142,38 @@ class AdaptiveLearner:
         self.performance_metrics = {
             'false_positives': 0,
             'true_positives': 0,
-            'response_times': [],
             'containment_success_rate': 0.0
         }
+        # Recent response times with a running sum for the average
+        self._response_times: deque = deque(maxlen=RESPONSE_TIME_WINDOW)
+        self._response_time_sum = 0.0
+        self._response_cache: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+        self._build_response_cache()
+
+    def _build_response_cache(self):
+        """Precompute the action sequence for every (threat type, severity)"""
+        cache = {}
+        for threat_type, playbook in self.knowledge_base['response_playbooks'].items():
+            immediate = tuple(playbook.get('immediate_actions', ()))
+            containment = tuple(playbook.get('containment_actions', ()))
+            recovery = tuple(playbook.get('recovery_actions', ()))
+            cache[(threat_type, 'CRITICAL')] = immediate + containment
+            cache[(threat_type, 'HIGH')] = containment
+            cache[(threat_type, 'MEDIUM')] = recovery
+            cache[(threat_type, 'LOW')] = recovery
+        self._response_cache = cache
 
     def _initialize_knowledge_base(self) -> Dict[str, Any]:
         """Initialize the system knowledge base"""
         return {
             'threat_signatures': {
-                'malicious_processes': {},
-                'suspicious_patterns': {},
-                'network_indicators': {},
-                'behavioral_anomalies': {}
+                'malicious_processes': OrderedDict(),
+                'suspicious_patterns': OrderedDict(),
+                'network_indicators': OrderedDict(),
+                'behavioral_anomalies': OrderedDict()
             },
             'response_playbooks': {
-                'ransomware': self._get_ransomware_playbook(),
-                'trojan': self._get_trojan_playbook(),
-                'worm': self._get_worm_playbook(),
-                'miner': self._get_miner_playbook()
+                threat_type: dict(playbook) for threat_type, playbook in _BASE_PLAYBOOKS.items()
             },
             'optimization_rules': {
                 'threshold_adjustments': {},
@@ -38,129 +182,17 @@ class AdaptiveLearner:
             }
         }
 
-    def _get_ransomware_playbook(self) -> Dict[str, Any]:
-        """Get ransomware response playbook"""
-        return {
-            'immediate_actions': [
-                'isolate_network',
-                'kill_malicious_process',
-                'lock_file_system',
-                'trigger_emergency_backup'
-            ],
-            'containment_actions': [
-                'block_smb_sharing',
-                'disable_remote_services',
-                'enable_file_protection',
-                'alert_security_team'
-            ],
-            'recovery_actions': [
-                'restore_from_backup',
-                'scan_for_persistence',
-                'validate_system_integrity',
-                'update_security_policies'
-            ],
-            'prevention_enhancements': [
-                'enhance_file_monitoring',
-                'strict_process_whitelisting',
-                'network_segmentation',
-                'backup_verification'
-            ]
-        }
-
-    def _get_trojan_playbook(self) -> Dict[str, Any]:
-        """Get trojan response playbook"""
-        return {
-            'immediate_actions': [
-                'isolate_system',
-                'terminate_suspicious_processes',
-                'block_outbound_connections',
-                'collect_forensic_data'
-            ],
-            'containment_actions': [
-                'enable_process_monitoring',
-                'scan_for_persistence',
-                'check_network_connections',
-                'analyze_startup_items'
-            ],
-            'recovery_actions': [
-                'remove_malicious_files',
-                'clean_registry_entries',
-                'update_security_software',
-                'system_integrity_check'
-            ],
-            'prevention_enhancements': [
-                'enhance_execution_control',
-                'application_whitelisting',
-                'network_traffic_analysis',
-                'user_behavior_monitoring'
-            ]
-        }
-
-    def _get_worm_playbook(self) -> Dict[str, Any]:
-        """Get worm response playbook"""
-        return {
-            'immediate_actions': [
-                'network_wide_alert',
-                'block_lateral_movement',
-                'isolate_infected_segments',
-                'enable_aggressive_monitoring'
-            ],
-            'containment_actions': [
-                'patch_vulnerabilities',
-                'update_security_rules',
-                'monitor_network_traffic',
-                'scan_all_systems'
-            ],
-            'recovery_actions': [
-                'clean_infected_systems',
-                'validate_network_security',
-                'update_access_controls',
-                'security_policy_review'
-            ],
-            'prevention_enhancements': [
-                'vulnerability_management',
-                'network_segmentation',
-                'intrusion_detection_rules',
-                'regular_security_assessments'
-            ]
-        }
-
-    def _get_miner_playbook(self) -> Dict[str, Any]:
-        """Get cryptominer response playbook"""
-        return {
-            'immediate_actions': [
-                'kill_mining_processes',
-                'block_mining_pool_ips',
-                'reduce_system_load',
-                'analyze_resource_usage'
-            ],
-            'containment_actions': [
-                'monitor_cpu_usage',
-                'block_suspicious_ports',
-                'scan_for_mining_software',
-                'check_system_performance'
-            ],
-            'recovery_actions': [
-                'remove_mining_software',
-                'clean_system_files',
-                'optimize_performance',
-                'update_resource_monitoring'
-            ],
-            'prevention_enhancements': [
-                'resource_usage_monitoring',
-                'network_traffic_analysis',
-                'process_behavior_analysis',
-                'system_performance_baselines'
-            ]
-        }
-
     async def learn_from_incident(self, incident_data: Dict[str, Any]) -> Dict[str, Any]:
         """Learn from incident and update knowledge base"""
-        self.logger.info(f"Learning from incident: {incident_data.get('incident_id')}")
+        self.logger.info("Learning from incident: %s", incident_data.get('incident_id'))
+        # One timestamp stamps everything learned from this incident
+        timestamp = datetime.now().isoformat()
+        # Classification is matched case-insensitively; normalise it once
+        attack_class = incident_data.get('llm_analysis', {}).get('attack_classification', '').upper()
         
         updates = {
-            'threat_signatures': await self._update_threat_signatures(incident_data),
-            'response_playbooks': await self._optimize_response_playbooks(incident_data),
+            'threat_signatures': await self._update_threat_signatures(incident_data, timestamp),
+            'response_playbooks': await self._optimize_response_playbooks(incident_data, attack_class),
             'optimization_rules': await self._update_optimization_rules(incident_data)
         }
         
@@ -168,15 +200,17 @@ class AdaptiveLearner:
         await self._update_performance_metrics(incident_data)
         
         # Apply updates to knowledge base
-        self.knowledge_base = self._merge_knowledge_updates(updates)
+        self._apply_knowledge_updates(updates)
+        if updates['response_playbooks']:
+            self._build_response_cache()
         
         return {
             'updates_applied': len(updates['threat_signatures']) + len(updates['response_playbooks']) + len(updates['optimization_rules']),
             'performance_metrics': self.performance_metrics,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp
         }
 
-    async def _update_threat_signatures(self, incident_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _update_threat_signatures(self, incident_data: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
         """Update threat signatures based on incident"""
         updates = {}
         alert_data = incident_data.get('alert', {})
@@ -185,7 +219,7 @@ class AdaptiveLearner:
         # Update malicious processes
         malware_process = alert_data.get('malware_process')
         if malware_process:
-            process_updates = self._update_malicious_process(malware_process, incident_data)
+            process_updates = self._update_malicious_process(malware_process, incident_data, timestamp)
             updates['malicious_processes'] = process_updates
         
         # Update suspicious patterns
@@ -198,18 +232,20 @@ class AdaptiveLearner:
         
         return updates
 
-    def _update_malicious_process(self, process_name: str, incident_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _update_malicious_process(self, process_name: str, incident_data: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
         """Update malicious process signatures"""
+        # The same process names recur across hosts; share one key object
+        process_name = sys.intern(process_name)
         confidence = incident_data.get('llm_analysis', {}).get('confidence_score', 0.5)
         threat_level = incident_data.get('alert', {}).get('threat_level', 'medium')
         
         return {
             process_name: {
-                'first_seen': datetime.now().isoformat(),
+                'first_seen': timestamp,
                 'confidence': confidence,
                 'threat_level': threat_level,
                 'incident_count': 1,
-                'last_updated': datetime.now().isoformat()
+                'last_updated': timestamp
             }
         }
 
@@ -249,13 +285,12 @@ class AdaptiveLearner:
         
         return indicators
 
-    async def _optimize_response_playbooks(self, incident_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _optimize_response_playbooks(self, incident_data: Dict[str, Any], attack_class: str) -> Dict[str, Any]:
         """Optimize response playbooks based on incident outcomes"""
         optimizations = {}
-        attack_class = incident_data.get('llm_analysis', {}).get('attack_classification', '')
         response_effectiveness = self._assess_response_effectiveness(incident_data)
         
-        if 'RANSOMWARE' in attack_class.upper():
+        if 'RANSOMWARE' in attack_class:
             optimizations['ransomware'] = self._optimize_ransomware_playbook(incident_data, response_effectiveness)
         
         return optimizations
@@ -281,8 +316,8 @@ class AdaptiveLearner:
         
         if effectiveness < 0.7:
             # Need more aggressive containment
-            optimizations['immediate_actions'] = ['enhanced_network_isolation', 'immediate_backup_trigger']
-            optimizations['containment_actions'] = ['strict_file_system_lockdown', 'aggressive_process_termination']
+            optimizations['immediate_actions'] = ('enhanced_network_isolation', 'immediate_backup_trigger')
+            optimizations['containment_actions'] = ('strict_file_system_lockdown', 'aggressive_process_termination')
         
         return optimizations
 
@@ -304,11 +339,11 @@ class AdaptiveLearner:
         """Update system performance metrics"""
         # Update response times
         response_time = self._calculate_response_time(incident_data)
-        self.performance_metrics['response_times'].append(response_time)
-        
-        # Keep only last 100 response times
-        if len(self.performance_metrics['response_times']) > 100:
-            self.performance_metrics['response_times'] = self.performance_metrics['response_times'][-100:]
+        if len(self._response_times) == RESPONSE_TIME_WINDOW:
+            # The oldest time is evicted by the append below
+            self._response_time_sum -= self._response_times[0]
+        self._response_times.append(response_time)
+        self._response_time_sum += response_time
         
         # Update success rates
         if self._was_incident_contained(incident_data):
@@ -326,16 +361,16 @@ class AdaptiveLearner:
     def _calculate_response_time(self, incident_data: Dict[str, Any]) -> float:
         """Calculate response time for incident"""
         alert_time = incident_data.get('alert', {}).get('timestamp')
-        if isinstance(alert_time, str):
-            alert_time = datetime.fromisoformat(alert_time)
-        
         response_time = incident_data.get('response_timestamp')
-        if isinstance(response_time, str):
-            response_time = datetime.fromisoformat(response_time)
-        
-        if alert_time and response_time:
-            return (response_time - alert_time).total_seconds()
-        return 0.0
+        if not alert_time or not response_time:
+            return 0.0
+        
+        # Epoch floats from the pipeline; anything else is converted once
+        if not isinstance(alert_time, float):
+            alert_time = to_epoch(alert_time)
+        if not isinstance(response_time, float):
+            response_time = to_epoch(response_time)
+        return max(0.0, response_time - alert_time)
 
     def _was_incident_contained(self, incident_data: Dict[str, Any]) -> bool:
         """Determine if incident was successfully contained"""
@@ -344,35 +379,44 @@ class AdaptiveLearner:
         
         return propagation_likelihood in ['LOW', 'MEDIUM']
 
-    def _merge_knowledge_updates(self, updates: Dict[str, Any]) -> Dict[str, Any]:
-        """Merge updates into knowledge base"""
-        merged_kb = self.knowledge_base.copy()
-        
+    def _apply_knowledge_updates(self, updates: Dict[str, Any]):
+        """Merge updates into the knowledge base in place"""
         for category, category_updates in updates.items():
-            if category in merged_kb:
-                for subcategory, sub_updates in category_updates.items():
-                    if subcategory in merged_kb[category]:
-                        merged_kb[category][subcategory].update(sub_updates)
-                    else:
-                        merged_kb[category][subcategory] = sub_updates
-        
-        return merged_kb
+            knowledge = self.knowledge_base.get(category)
+            if knowledge is None:
+                continue
+            for subcategory, sub_updates in category_updates.items():
+                if subcategory in knowledge:
+                    knowledge[subcategory].update(sub_updates)
+                else:
+                    knowledge[subcategory] = sub_updates
+        
+        self._trim_threat_signatures(updates.get('threat_signatures', {}))
 
-    async def get_optimized_response(self, threat_type: str, severity: str) -> List[str]:
+    def _trim_threat_signatures(self, signature_updates: Dict[str, Any]):
+        """Evict the least recently updated signatures beyond the per-category cap"""
+        signatures = self.knowledge_base['threat_signatures']
+        for subcategory, sub_updates in signature_updates.items():
+            bucket = signatures[subcategory]
+            if not isinstance(bucket, OrderedDict):
+                bucket = signatures[subcategory] = OrderedDict(bucket)
+            for name in sub_updates:
+                bucket.move_to_end(name)
+            while len(bucket) > MAX_SIGNATURES_PER_CATEGORY:
+                bucket.popitem(last=False)
+
+    async def get_optimized_response(self, threat_type: str, severity: str) -> Tuple[str, ...]:
         """Get optimized response actions for threat type"""
-        playbook = self.knowledge_base['response_playbooks'].get(threat_type.lower(), {})
-        
-        if severity == 'CRITICAL':
-            return playbook.get('immediate_actions', []) + playbook.get('containment_actions', [])
-        elif severity == 'HIGH':
-            return playbook.get('containment_actions', [])
-        else:
-            return playbook.get('recovery_actions', [])
+        threat_type = sys.intern(threat_type.lower())
+        actions = self._response_cache.get((threat_type, severity))
+        if actions is None:
+            # Severities other than CRITICAL/HIGH get the recovery actions
+            actions = self._response_cache.get((threat_type, 'LOW'), ())
+        return actions
 
     async def get_performance_report(self) -> Dict[str, Any]:
         """Get system performance report"""
-        response_times = self.performance_metrics.get('response_times', [])
-        avg_response_time = sum(response_times) / len(response_times) if response_times else 0
+        avg_response_time = self._response_time_sum / len(self._response_times) if self._response_times else 0
         
         return {
             'performance_metrics': {
@@ -1,19 +1,174 @@
+import asyncio
+import heapq
 import logging
-from typing import Dict, List, Any
+import sys
+import time
+from bisect import bisect_right
+from typing import Dict, List, Any, Mapping, Tuple
 from datetime import datetime
+from types import MappingProxyType
 from models.schemas import ThreatAlert, LLMAnalysis
+from config.settings import settings
 from utils.helpers import calculate_risk_score
 
+# Business impact keywords, checked in order of precedence
+_BUSINESS_IMPACT_MULTIPLIERS = (
+    ('HIGH', 1.5),
+    ('MEDIUM', 1.2),
+    ('LOW', 0.8)
+)
+
+# Infrastructure treated as at risk in every incident
+_COMMON_CRITICAL_ASSETS = frozenset((
+    'domain-controller',
+    'file-server',
+    'backup-system',
+    'database-server'
+))
+
+# Risk score band boundaries; a score on a boundary falls in the higher band
+_RISK_THRESHOLDS = (4.0, 6.0, 8.0)
+_RISK_LEVELS = ('LOW', 'MEDIUM', 'HIGH', 'CRITICAL')
+_CONTAINMENT_URGENCIES = ('MONITOR', 'PRIORITY', 'URGENT', 'IMMEDIATE')
+
+def _risk_band(risk_score: float) -> Tuple[str, str]:
+    """Risk level and containment urgency for a risk score"""
+    band = bisect_right(_RISK_THRESHOLDS, risk_score)
+    return _RISK_LEVELS[band], _CONTAINMENT_URGENCIES[band]
+
+def _propagation_from_counts(path_count: int, has_exposed_nodes: bool) -> str:
+    """Propagation likelihood from the shape of a propagation graph"""
+    if path_count >= 3:
+        return 'VERY_HIGH'
+    elif path_count >= 1:
+        return 'HIGH'
+    elif has_exposed_nodes:
+        return 'MEDIUM'
+    else:
+        return 'LOW'
+
+# How long an emergency mode stays active, by response plan duration
+_PLAN_DURATION_SECONDS = {
+    'emergency_1hour': 3600,
+    'enhanced_4hours': 4 * 3600,
+    'monitoring_24hours': 24 * 3600
+}
+MAX_EMERGENCY_MODES = 1024
+
+# Response plan templates; read-only since every incident shares them
+_AGGRESSIVE_CONTAINMENT_PLAN = MappingProxyType({
+    'response_level': 'AGGRESSIVE_CONTAINMENT',
+    'duration': 'emergency_1hour',
+    'infected_agent_commands': (
+        'maintain_full_isolation',
+        'begin_forensic_collection',
+        'prepare_deep_scan_recovery',
+        'do_not_reconnect_network'
+    ),
+    'exposed_agent_commands': (
+        'block_all_inbound_traffic',
+        'enable_maximum_zero_trust',
+        'lock_all_sensitive_directories',
+        'trigger_immediate_backup',
+        'enable_process_whitelisting'
+    ),
+    'network_wide_commands': (
+        'block_p2p_communications',
+        'isolate_affected_network_segments',
+        'enable_enterprise_protection_mode',
+        'alert_security_team_immediately'
+    ),
+    'communication_protocol': MappingProxyType({
+        'updates_every': '2_minutes',
+        'status_reports': 'every_5_minutes',
+        'escalation_points': ('CISO', 'Network_Admin', 'Security_Team')
+    })
+})
+
+_TARGETED_CONTAINMENT_PLAN = MappingProxyType({
+    'response_level': 'TARGETED_CONTAINMENT',
+    'duration': 'enhanced_4hours',
+    'infected_agent_commands': (
+        'restrict_network_access',
+        'enable_enhanced_monitoring',
+        'backup_critical_files',
+        'scan_for_persistence'
+    ),
+    'exposed_agent_commands': (
+        'block_suspicious_protocols',
+        'enable_enhanced_protection',
+        'monitor_lateral_movement',
+        'increase_logging_verbosity'
+    ),
+    'network_wide_commands': (
+        'monitor_cross_segment_traffic',
+        'alert_related_departments',
+        'enable_selective_isolation'
+    ),
+    'communication_protocol': MappingProxyType({
+        'updates_every': '5_minutes',
+        'status_reports': 'every_15_minutes',
+        'escalation_points': ('Security_Team', 'Department_Head')
+    })
+})
+
+_ENHANCED_MONITORING_PLAN = MappingProxyType({
+    'response_level': 'ENHANCED_MONITORING',
+    'duration': 'monitoring_24hours',
+    'infected_agent_commands': (
+        'increase_security_logging',
+        'monitor_process_activity',
+        'report_suspicious_behavior',
+        'maintain_normal_operations'
+    ),
+    'exposed_agent_commands': (
+        'enable_preventive_protection',
+        'monitor_for_similar_patterns',
+        'ready_isolation_protocols'
+    ),
+    'network_wide_commands': (
+        'continue_normal_operations',
+        'monitor_network_health'
+    ),
+    'communication_protocol': MappingProxyType({
+        'updates_every': '15_minutes',
+        'status_reports': 'every_hour',
+        'escalation_points': ('Security_Team',)
+    })
+})
+
+def _plan_for_incident(plan: Mapping[str, Any]) -> Dict[str, Any]:
+    """Plain dict copy of a plan template, for results leaving the engine"""
+    incident_plan = {
+        key: list(value) if isinstance(value, tuple) else value
+        for key, value in plan.items()
+    }
+    protocol = dict(plan['communication_protocol'])
+    protocol['escalation_points'] = list(protocol['escalation_points'])
+    incident_plan['communication_protocol'] = protocol
+    return incident_plan
+
 class CoordinationEngine:
+    __slots__ = (
+        'agent_manager', 'command_dispatcher', 'logger', 'emergency_modes',
+        '_emergency_expiry', '_emergency_heap'
+    )
+
     def __init__(self, agent_manager, command_dispatcher):
         self.agent_manager = agent_manager
         self.command_dispatcher = command_dispatcher
         self.logger = logging.getLogger(__name__)
         self.emergency_modes = {}  # incident_id -> emergency_data
+        # Expiry bookkeeping for emergency_modes: incident_id -> expires_at,
+        # plus a heap of (expires_at, incident_id) to find the next to expire
+        self._emergency_expiry: Dict[str, float] = {}
+        self._emergency_heap: List[Tuple[float, str]] = []
 
     async def coordinate_response(self, alert: ThreatAlert, llm_analysis: LLMAnalysis, correlation_data: Dict[str, Any]) -> Dict[str, Any]:
         """Coordinate network-wide response based on threat analysis"""
-        self.logger.info(f"Coordinating response for incident from {alert.agent_id}")
+        self.logger.info("Coordinating response for incident from %s", alert.agent_id)
+        # One timestamp for everything recorded about this coordination
+        timestamp = datetime.now().isoformat()
         
         # Calculate comprehensive risk assessment
         risk_assessment = await self._assess_network_risk(alert, llm_analysis, correlation_data)
@@ -22,12 +177,12 @@ class CoordinationEngine:
         response_plan = self._generate_response_plan(alert, llm_analysis, risk_assessment)
         
         # Execute coordinated response
-        await self._execute_coordinated_response(alert, response_plan, risk_assessment)
+        await self._execute_coordinated_response(alert, response_plan, risk_assessment, timestamp)
         
         return {
             'risk_assessment': risk_assessment,
-            'response_plan': response_plan,
-            'execution_summary': await self._get_execution_summary()
+            'response_plan': _plan_for_incident(response_plan),
+            'execution_summary': await self._get_execution_summary(timestamp)
         }
 
     async def _assess_network_risk(self, alert: ThreatAlert, llm_analysis: LLMAnalysis, correlation_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -48,85 +203,55 @@ class CoordinationEngine:
         
         # Adjust based on LLM confidence and business impact
         llm_confidence = llm_analysis.confidence_score
-        business_impact_multiplier = self._get_business_impact_multiplier(llm_analysis.business_impact)
+        business_impact_multiplier = self._get_business_impact_multiplier(llm_analysis.business_impact.upper())
         
         final_risk_score = min(10.0, base_risk * llm_confidence * business_impact_multiplier)
+        risk_level, containment_urgency = _risk_band(final_risk_score)
         
         return {
             'risk_score': final_risk_score,
-            'risk_level': self._get_risk_level(final_risk_score),
+            'risk_level': risk_level,
             'exposed_agents': exposed_agents,
             'critical_assets_at_risk': critical_assets_at_risk,
             'propagation_likelihood': self._assess_propagation_likelihood(propagation_graph),
             'business_impact': llm_analysis.business_impact,
-            'containment_urgency': self._determine_containment_urgency(final_risk_score)
+            'containment_urgency': containment_urgency
         }
 
     def _identify_critical_assets(self, source_agent: str, exposed_agents: List[str], topology: Dict[str, Any]) -> List[str]:
         """Identify critical assets at risk"""
-        critical_assets = set()
+        # Start from the common critical infrastructure
+        critical_assets = set(_COMMON_CRITICAL_ASSETS)
         
         # Add assets from source agent
         source_agent_data = None  # Would get from database in real implementation
-        if source_agent_data and 'critical_assets' in source_agent_data:
-            critical_assets.update(source_agent_data['critical_assets'])
-        
-        # Add common critical infrastructure
-        common_critical = ['domain-controller', 'file-server', 'backup-system', 'database-server']
-        critical_assets.update(common_critical)
+        if source_agent_data:
+            critical_assets.update(source_agent_data.get('critical_assets', ()))
         
         return list(critical_assets)
 
     def _get_business_impact_multiplier(self, business_impact: str) -> float:
-        """Get multiplier based on business impact assessment"""
-        multipliers = {
-            'HIGH': 1.5,
-            'MEDIUM': 1.2,
-            'LOW': 0.8
-        }
-        
-        for level, multiplier in multipliers.items():
-            if level in business_impact.upper():
+        """Get multiplier based on an upper-cased business impact assessment"""
+        for level, multiplier in _BUSINESS_IMPACT_MULTIPLIERS:
+            if level in business_impact:
                 return multiplier
         return 1.0
 
     def _get_risk_level(self, risk_score: float) -> str:
         """Convert risk score to risk level"""
-        if risk_score >= 8.0:
-            return 'CRITICAL'
-        elif risk_score >= 6.0:
-            return 'HIGH'
-        elif risk_score >= 4.0:
-            return 'MEDIUM'
-        else:
-            return 'LOW'
+        return _risk_band(risk_score)[0]
 
     def _assess_propagation_likelihood(self, propagation_graph: Dict[str, Any]) -> str:
         """Assess likelihood of further propagation"""
-        propagation_paths = propagation_graph.get('propagation_paths', [])
-        exposed_nodes = propagation_graph.get('exposed_nodes', [])
-        
-        if len(propagation_paths) >= 3:
-            return 'VERY_HIGH'
-        elif len(propagation_paths) >= 1:
-            return 'HIGH'
-        elif exposed_nodes:
-            return 'MEDIUM'
-        else:
-            return 'LOW'
+        # Only the path count up to 3 and whether anything is exposed matter
+        path_count = min(len(propagation_graph.get('propagation_paths', ())), 3)
+        return _propagation_from_counts(path_count, bool(propagation_graph.get('exposed_nodes')))
 
     def _determine_containment_urgency(self, risk_score: float) -> str:
         """Determine containment urgency"""
-        if risk_score >= 8.0:
-            return 'IMMEDIATE'
-        elif risk_score >= 6.0:
-            return 'URGENT'
-        elif risk_score >= 4.0:
-            return 'PRIORITY'
-        else:
-            return 'MONITOR'
+        return _risk_band(risk_score)[1]
 
-    def _generate_response_plan(self, alert: ThreatAlert, llm_analysis: LLMAnalysis, risk_assessment: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_response_plan(self, alert: ThreatAlert, llm_analysis: LLMAnalysis, risk_assessment: Dict[str, Any]) -> Mapping[str, Any]:
         """Generate comprehensive response plan"""
         risk_level = risk_assessment['risk_level']
         response_strategy = llm_analysis.recommended_network_response
@@ -138,123 +263,52 @@ class CoordinationEngine:
         else:
             return self._generate_enhanced_monitoring_plan(alert, risk_assessment)
 
-    def _generate_aggressive_containment_plan(self, alert: ThreatAlert, risk_assessment: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_aggressive_containment_plan(self, alert: ThreatAlert, risk_assessment: Dict[str, Any]) -> Mapping[str, Any]:
         """Generate aggressive containment plan for critical threats"""
-        return {
-            'response_level': 'AGGRESSIVE_CONTAINMENT',
-            'duration': 'emergency_1hour',
-            'infected_agent_commands': [
-                'maintain_full_isolation',
-                'begin_forensic_collection',
-                'prepare_deep_scan_recovery',
-                'do_not_reconnect_network'
-            ],
-            'exposed_agent_commands': [
-                'block_all_inbound_traffic',
-                'enable_maximum_zero_trust',
-                'lock_all_sensitive_directories',
-                'trigger_immediate_backup',
-                'enable_process_whitelisting'
-            ],
-            'network_wide_commands': [
-                'block_p2p_communications',
-                'isolate_affected_network_segments',
-                'enable_enterprise_protection_mode',
-                'alert_security_team_immediately'
-            ],
-            'communication_protocol': {
-                'updates_every': '2_minutes',
-                'status_reports': 'every_5_minutes',
-                'escalation_points': ['CISO', 'Network_Admin', 'Security_Team']
-            }
-        }
+        return _AGGRESSIVE_CONTAINMENT_PLAN
 
-    def _generate_targeted_containment_plan(self, alert: ThreatAlert, risk_assessment: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_targeted_containment_plan(self, alert: ThreatAlert, risk_assessment: Dict[str, Any]) -> Mapping[str, Any]:
         """Generate targeted containment plan for high threats"""
-        return {
-            'response_level': 'TARGETED_CONTAINMENT',
-            'duration': 'enhanced_4hours',
-            'infected_agent_commands': [
-                'restrict_network_access',
-                'enable_enhanced_monitoring',
-                'backup_critical_files',
-                'scan_for_persistence'
-            ],
-            'exposed_agent_commands': [
-                'block_suspicious_protocols',
-                'enable_enhanced_protection',
-                'monitor_lateral_movement',
-                'increase_logging_verbosity'
-            ],
-            'network_wide_commands': [
-                'monitor_cross_segment_traffic',
-                'alert_related_departments',
-                'enable_selective_isolation'
-            ],
-            'communication_protocol': {
-                'updates_every': '5_minutes',
-                'status_reports': 'every_15_minutes',
-                'escalation_points': ['Security_Team', 'Department_Head']
-            }
-        }
+        return _TARGETED_CONTAINMENT_PLAN
 
-    def _generate_enhanced_monitoring_plan(self, alert: ThreatAlert, risk_assessment: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_enhanced_monitoring_plan(self, alert: ThreatAlert, risk_assessment: Dict[str, Any]) -> Mapping[str, Any]:
         """Generate enhanced monitoring plan for medium/low threats"""
-        return {
-            'response_level': 'ENHANCED_MONITORING',
-            'duration': 'monitoring_24hours',
-            'infected_agent_commands': [
-                'increase_security_logging',
-                'monitor_process_activity',
-                'report_suspicious_behavior',
-                'maintain_normal_operations'
-            ],
-            'exposed_agent_commands': [
-                'enable_preventive_protection',
-                'monitor_for_similar_patterns',
-                'ready_isolation_protocols'
-            ],
-            'network_wide_commands': [
-                'continue_normal_operations',
-                'monitor_network_health'
-            ],
-            'communication_protocol': {
-                'updates_every': '15_minutes',
-                'status_reports': 'every_hour',
-                'escalation_points': ['Security_Team']
-            }
-        }
+        return _ENHANCED_MONITORING_PLAN
 
-    async def _execute_coordinated_response(self, alert: ThreatAlert, response_plan: Dict[str, Any], risk_assessment: Dict[str, Any]):
+    async def _execute_coordinated_response(self, alert: ThreatAlert, response_plan: Mapping[str, Any], risk_assessment: Dict[str, Any], timestamp: str):
         """Execute the coordinated network response"""
         risk_level = risk_assessment['risk_level']
+        incident_id = getattr(alert, 'incident_id', 'unknown')
+        # The phases target independent agents, so they run concurrently
+        phases = []
         
         if risk_level in ['CRITICAL', 'HIGH']:
-            await self._activate_emergency_protocol(alert, response_plan, risk_assessment)
+            phases.append(self._activate_emergency_protocol(alert, response_plan, risk_assessment, timestamp))
         
         # Dispatch commands to infected agent
         infected_commands = response_plan.get('infected_agent_commands', [])
         if infected_commands:
-            await self.command_dispatcher.dispatch_agent_command(
+            phases.append(self.command_dispatcher.dispatch_agent_command(
                 alert.agent_id, 
                 infected_commands,
-                getattr(alert, 'incident_id', 'unknown')
-            )
+                incident_id
+            ))
         
         # Dispatch commands to exposed agents
         exposed_agents = risk_assessment.get('exposed_agents', [])
         exposed_commands = response_plan.get('exposed_agent_commands', [])
-        for agent_id in exposed_agents:
-            await self.command_dispatcher.dispatch_agent_command(
-                agent_id,
-                exposed_commands,
-                getattr(alert, 'incident_id', 'unknown')
-            )
+        phases.append(self.command_dispatcher.dispatch_agent_commands_bulk(
+            exposed_agents,
+            exposed_commands,
+            incident_id
+        ))
         
         # Execute network-wide commands if needed
         network_commands = response_plan.get('network_wide_commands', [])
         if network_commands and risk_level in ['CRITICAL', 'HIGH']:
-            await self._execute_network_wide_commands(alert, network_commands)
+            phases.append(self._execute_network_wide_commands(alert, network_commands))
+        
+        await asyncio.gather(*phases)
 
     # async def _activate_emergency_protocol(self, alert: ThreatAlert, response_plan: Dict[str, Any], risk_assessment: Dict[str, Any]):
     #     """Activate emergency defense protocol"""
@@ -274,7 +328,7 @@ class CoordinationEngine:
     #     # Broadcast emergency notification
     #     await self.command_dispatcher.broadcast_network_incident(emergency_data)
     #     self.logger.warning(f"EMERGENCY PROTOCOL ACTIVATED for incident {incident_id}")
-    async def _activate_emergency_protocol(self, alert: ThreatAlert, response_plan: Dict[str, Any], risk_assessment: Dict[str, Any]):
+    async def _activate_emergency_protocol(self, alert: ThreatAlert, response_plan: Mapping[str, Any], risk_assessment: Dict[str, Any], timestamp: str):
         """Activate emergency defense protocol - UPDATED with IP address"""
         incident_id = getattr(alert, 'incident_id', 'unknown')
     
@@ -290,27 +344,57 @@ class CoordinationEngine:
         'malware_process': getattr(alert, 'malware_process', 'unknown'),
         'detection_confidence': getattr(alert, 'detection_confidence', 0.0),
         'response_level': response_plan['response_level'],
-        'activated_at': datetime.now().isoformat(),
+        'activated_at': timestamp,
         'duration': response_plan['duration'],
         'required_actions': response_plan.get('network_wide_commands', [])
         }
     
-        self.emergency_modes[incident_id] = emergency_data
+        self._track_emergency_mode(incident_id, emergency_data, response_plan['duration'])
     
     # Broadcast emergency notification
         await self.command_dispatcher.broadcast_network_incident(emergency_data)
-        self.logger.warning(f"EMERGENCY PROTOCOL ACTIVATED for incident {incident_id} - Agent: {alert.agent_id} ({agent_ip})")
+        self.logger.warning("EMERGENCY PROTOCOL ACTIVATED for incident %s - Agent: %s (%s)", incident_id, alert.agent_id, agent_ip)
 
     async def _execute_network_wide_commands(self, alert: ThreatAlert, commands: List[str]):
         """Execute network-wide commands"""
         # This would interface with network infrastructure
         # For now, log the commands that would be executed
-        self.logger.info(f"Network-wide commands for {alert.agent_id}: {commands}")
+        self.logger.info("Network-wide commands for %s: %s", alert.agent_id, commands)
+
+    def _track_emergency_mode(self, incident_id: str, emergency_data: Dict[str, Any], duration: str):
+        """Record an emergency mode that expires after its plan duration"""
+        now = time.monotonic()
+        self._expire_emergency_modes(now)
+        
+        expires_at = now + _PLAN_DURATION_SECONDS.get(duration, settings.EMERGENCY_MODE_DURATION)
+        # Held as a key in two dicts and the heap
+        incident_id = sys.intern(incident_id)
+        self.emergency_modes[incident_id] = emergency_data
+        self._emergency_expiry[incident_id] = expires_at
+        heapq.heappush(self._emergency_heap, (expires_at, incident_id))
+        
+        # Past the cap, the modes closest to expiring go first
+        while len(self.emergency_modes) > MAX_EMERGENCY_MODES:
+            self._pop_emergency_mode()
+
+    def _expire_emergency_modes(self, now: float):
+        """Drop emergency modes whose duration has elapsed"""
+        while self._emergency_heap and self._emergency_heap[0][0] <= now:
+            self._pop_emergency_mode()
+
+    def _pop_emergency_mode(self):
+        """Remove the emergency mode at the top of the expiry heap"""
+        expires_at, incident_id = heapq.heappop(self._emergency_heap)
+        # Entries superseded by a re-activation are skipped
+        if self._emergency_expiry.get(incident_id) == expires_at:
+            del self._emergency_expiry[incident_id]
+            del self.emergency_modes[incident_id]
 
-    async def _get_execution_summary(self) -> Dict[str, Any]:
+    async def _get_execution_summary(self, timestamp: str) -> Dict[str, Any]:
         """Get summary of response execution"""
+        self._expire_emergency_modes(time.monotonic())
         return {
             'emergency_modes_active': len(self.emergency_modes),
-            'last_coordination': datetime.now().isoformat(),
+            'last_coordination': timestamp,
             'active_incidents': list(self.emergency_modes.keys())
         }
\ No newline at end of file
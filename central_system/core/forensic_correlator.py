@@ -1,167 +1,310 @@
+import asyncio
+import heapq
 import logging
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple
 from models.schemas import ThreatAlert
 from models.database import DatabaseManager
 
+# Alerts this far before the current one (or any time after it) are correlated
+CORRELATION_WINDOW = timedelta(minutes=120)
+# History fetched for correlation; an hour wider than the window so alerts
+# that reach the server late are still matched against their full window
+CORRELATION_FETCH_HOURS = 3
+# A burst of alerts within this many seconds shares one recent-alerts query
+RECENT_ALERTS_CACHE_SECONDS = 2
+# Most similar alerts kept as related to the current one
+MAX_RELATED_ALERTS = 50
+
+def _parse_timestamp(value: Any) -> datetime:
+    """Alert timestamp as a datetime; stored alerts may carry ISO strings"""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+@dataclass(frozen=True, slots=True)
+class _AlertFeatures:
+    """Parts of an alert compared by the similarity scorer, extracted once"""
+    malware: str  # lower-cased, '' when unknown
+    hosts: frozenset  # empty when the alert has no network connections
+    protocols: frozenset
+    has_file_patterns: bool
+    encryption_detected: Any
+    ransom_note_found: Any
+    extensions: frozenset
+
+def _alert_features(malware_process: str, forensic_data: Dict[str, Any]) -> _AlertFeatures:
+    """Extract the similarity features of an alert"""
+    connections = forensic_data.get('network_connections', [])
+    file_patterns = forensic_data.get('file_access_patterns', {})
+    return _AlertFeatures(
+        malware=(malware_process or '').lower(),
+        hosts=frozenset(conn.get('remote_host', '') for conn in connections),
+        protocols=frozenset(conn.get('protocol', '') for conn in connections),
+        has_file_patterns=bool(file_patterns),
+        encryption_detected=file_patterns.get('encryption_detected'),
+        ransom_note_found=file_patterns.get('ransom_note_found'),
+        extensions=frozenset(file_patterns.get('extensions_changed', []))
+    )
+
+# Outbound connections to these ports are reported as indicators (SMB, RDP, SSH, Telnet)
+_SUSPICIOUS_PORTS = frozenset((445, 3389, 22, 23))
+
+class _RelatedAnalysis(NamedTuple):
+    """Everything the correlation builders need from the related alerts"""
+    timeline_events: List[Dict[str, Any]]
+    related_agents: List[str]
+    malware_sources: Dict[str, List[str]]  # malware process -> reporting agents
+    suspicious_connections: List[Dict]
+    similarity_total: float
+
 class ForensicCorrelator:
     def __init__(self, db: DatabaseManager):
         self.db = db
         self.logger = logging.getLogger(__name__)
+        # (time bucket, hours) of the cached fetch and the alerts it returned
+        self._recent_alerts_key = None
+        self._recent_alerts: List[Dict[str, Any]] = []
+        self._recent_alerts_lock = asyncio.Lock()
+        # Alerts saved while a fetch is in flight, which its result may miss
+        self._saved_during_fetch: Optional[List[Dict[str, Any]]] = None
+
+    async def _get_recent_alerts(self, hours: int) -> List[Dict[str, Any]]:
+        """Recent alerts, cached for RECENT_ALERTS_CACHE_SECONDS; callers must not mutate them"""
+        key = (int(time.monotonic() // RECENT_ALERTS_CACHE_SECONDS), hours)
+        if key == self._recent_alerts_key:
+            return self._recent_alerts
+        
+        async with self._recent_alerts_lock:
+            # Another correlation may have fetched while this one waited
+            if key != self._recent_alerts_key:
+                self._saved_during_fetch = []
+                try:
+                    alerts = await self.db.get_recent_alerts(hours=hours)
+                    saved = self._saved_during_fetch
+                finally:
+                    self._saved_during_fetch = None
+                
+                if saved:
+                    fetched_ids = {alert.get('incident_id') for alert in alerts}
+                    alerts = [*alerts, *(row for row in saved if row['incident_id'] not in fetched_ids)]
+                self._recent_alerts = alerts
+                self._recent_alerts_key = key
+            return self._recent_alerts
+
+    def record_saved_alert(self, threat_alert: ThreatAlert):
+        """Add a just-saved alert to the cached recent alerts"""
+        if self._recent_alerts_key is None and self._saved_during_fetch is None:
+            return
+        
+        # Stored in the same shape get_recent_alerts returns
+        alert_row = {
+            **threat_alert.dict(),
+            'threat_level': threat_alert.threat_level.value,
+            'timestamp': threat_alert.timestamp.isoformat()
+        }
+        if self._saved_during_fetch is not None:
+            self._saved_during_fetch.append(alert_row)
+        if self._recent_alerts_key is not None:
+            # Scoring threads may be reading the cached list, so a new one is published
+            self._recent_alerts = [*self._recent_alerts, alert_row]
 
     async def correlate_threat(self, current_alert: ThreatAlert) -> Dict[str, Any]:
         """Main forensic correlation engine"""
         self.logger.info(f"Starting forensic correlation for alert from {current_alert.agent_id}")
         
         # Get recent alerts for correlation
-        recent_alerts = await self.db.get_recent_alerts(hours=24)
+        recent_alerts = await self._get_recent_alerts(CORRELATION_FETCH_HOURS)
+        
+        # Scoring is pure CPU work; run it off the event loop so agent
+        # traffic keeps being served while it runs
+        return await asyncio.to_thread(self._correlate, current_alert, recent_alerts)
+
+    def _correlate(self, current_alert: ThreatAlert, recent_alerts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Correlate an alert against already fetched recent alerts; they are not modified"""
+        # Filter and analyze related alerts; timestamps are parsed once here
+        relevant_alerts, relevant_scores, relevant_times = self._find_relevant_alerts(current_alert, recent_alerts)
         
-        # Filter and analyze related alerts
-        relevant_alerts = self._find_relevant_alerts(current_alert, recent_alerts)
+        # The current alert's forensic sections are looked up once for all builders
+        current_connections = current_alert.forensic_data.get('network_connections', [])
+        current_file_patterns = current_alert.forensic_data.get('file_access_patterns', {})
+        
+        # One pass over the related alerts feeds every builder below
+        related = self._analyze_related(current_alert, relevant_alerts, relevant_scores)
         
         # Build comprehensive correlation data
         correlation_data = {
-            'related_alerts': relevant_alerts,
-            'attack_timeline': self._build_attack_timeline(current_alert, relevant_alerts),
-            'propagation_graph': self._build_propagation_graph(current_alert, relevant_alerts),
-            'temporal_patterns': self._analyze_temporal_patterns(current_alert, relevant_alerts),
-            'correlation_confidence': self._calculate_correlation_confidence(current_alert, relevant_alerts),
-            'cross_agent_indicators': self._extract_cross_agent_indicators(current_alert, relevant_alerts)
+            'related_alerts': [
+                {**alert, 'similarity_score': score}
+                for alert, score in zip(relevant_alerts, relevant_scores)
+            ],
+            'attack_timeline': self._build_attack_timeline(current_alert, related.timeline_events, current_connections, current_file_patterns),
+            'propagation_graph': self._build_propagation_graph(current_alert, related.related_agents, current_connections, current_file_patterns),
+            'temporal_patterns': self._analyze_temporal_patterns(current_alert, relevant_times),
+            'correlation_confidence': self._calculate_correlation_confidence(len(relevant_alerts), related.similarity_total),
+            'cross_agent_indicators': self._extract_cross_agent_indicators(current_alert, related, current_connections)
         }
         
         return correlation_data
 
-    def _find_relevant_alerts(self, current_alert: ThreatAlert, all_alerts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Find alerts relevant to the current threat"""
+    def _find_relevant_alerts(self, current_alert: ThreatAlert, all_alerts: List[Dict[str, Any]],
+                              top_k: int = MAX_RELATED_ALERTS) -> Tuple[List[Dict[str, Any]], List[float], List[datetime]]:
+        """Find the top_k alerts most relevant to the current threat, with their scores and parsed timestamps"""
         relevant = []
-        current_time = current_alert.timestamp
+        current_incident_id = getattr(current_alert, 'incident_id', None)
+        # The current alert's side of every comparison is extracted once
+        current_features = _alert_features(current_alert.malware_process, current_alert.forensic_data)
+        # The window check is one comparison against a precomputed bound
+        # rather than a timedelta and division per alert
+        window_start = current_alert.timestamp - CORRELATION_WINDOW
         
         for alert in all_alerts:
             # Skip the current alert itself
-            if alert.get('incident_id') == getattr(current_alert, 'incident_id', None):
+            if alert.get('incident_id') == current_incident_id:
                 continue
                 
-            alert_time = datetime.fromisoformat(alert['timestamp']) if isinstance(alert['timestamp'], str) else alert['timestamp']
-            time_diff = (current_time - alert_time).total_seconds() / 60  # minutes
+            alert_time = _parse_timestamp(alert['timestamp'])
             
             # Include alerts from last 2 hours for correlation
-            if time_diff <= 120:
-                similarity_score = self._calculate_alert_similarity(current_alert, alert)
+            if alert_time >= window_start:
+                similarity_score = self._calculate_alert_similarity(current_features, alert)
                 
                 if similarity_score > 0.3:  # Threshold for relevance
-                    alert['similarity_score'] = similarity_score
-                    relevant.append(alert)
-        
-        # Sort by similarity score (most similar first)
-        relevant.sort(key=lambda x: x.get('similarity_score', 0), reverse=True)
-        return relevant
+                    relevant.append((similarity_score, alert, alert_time))
+        
+        # Keep the most similar alerts, most similar first
+        relevant = heapq.nlargest(top_k, relevant, key=lambda x: x[0])
+        return (
+            [alert for _, alert, _ in relevant],
+            [score for score, _, _ in relevant],
+            [alert_time for _, _, alert_time in relevant]
+        )
 
-    def _calculate_alert_similarity(self, alert1: ThreatAlert, alert2: Dict[str, Any]) -> float:
-        """Calculate similarity score between two alerts"""
+    def _calculate_alert_similarity(self, features1: _AlertFeatures, alert2: Dict[str, Any]) -> float:
+        """Calculate similarity score between an alert's features and a stored alert"""
+        forensic_data2 = alert2.get('forensic_data')
+        
+        # Without forensic data on either side the network and file scores
+        # are zero, so only the malware process can match
+        if not forensic_data2 or not (features1.hosts or features1.has_file_patterns):
+            malware2 = (alert2.get('malware_process') or '').lower()
+            return 0.4 if features1.malware and features1.malware == malware2 else 0.0
+        
+        features2 = _alert_features(alert2.get('malware_process'), forensic_data2)
         score = 0.0
         
         # Malware process similarity
-        malware1 = alert1.malware_process or ""
-        malware2 = alert2.get('malware_process', "")
-        if malware1 and malware2 and malware1.lower() == malware2.lower():
+        if features1.malware and features1.malware == features2.malware:
             score += 0.4
         
         # Network connection similarity
-        net_similarity = self._compare_network_patterns(
-            alert1.forensic_data.get('network_connections', []),
-            alert2.get('forensic_data', {}).get('network_connections', [])
-        )
-        score += net_similarity * 0.3
+        score += self._compare_network_patterns(features1, features2) * 0.3
         
         # File pattern similarity
-        file_similarity = self._compare_file_patterns(
-            alert1.forensic_data.get('file_access_patterns', {}),
-            alert2.get('forensic_data', {}).get('file_access_patterns', {})
-        )
-        score += file_similarity * 0.3
+        score += self._compare_file_patterns(features1, features2) * 0.3
         
         return min(1.0, score)
 
-    def _compare_network_patterns(self, connections1: List[Dict], connections2: List[Dict]) -> float:
+    def _compare_network_patterns(self, features1: _AlertFeatures, features2: _AlertFeatures) -> float:
         """Compare network connection patterns"""
-        if not connections1 or not connections2:
+        hosts1, hosts2 = features1.hosts, features2.hosts
+        if not hosts1 or not hosts2:
             return 0.0
-            
-        # Extract unique hosts and protocols
-        hosts1 = set(conn.get('remote_host', '') for conn in connections1)
-        hosts2 = set(conn.get('remote_host', '') for conn in connections2)
-        protocols1 = set(conn.get('protocol', '') for conn in connections1) 
-        protocols2 = set(conn.get('protocol', '') for conn in connections2)
+        protocols1, protocols2 = features1.protocols, features2.protocols
         
         # Calculate similarity
-        common_hosts = hosts1.intersection(hosts2)
-        common_protocols = protocols1.intersection(protocols2)
-        
-        host_similarity = len(common_hosts) / max(len(hosts1), len(hosts2)) if hosts1 or hosts2 else 0
-        protocol_similarity = len(common_protocols) / max(len(protocols1), len(protocols2)) if protocols1 or protocols2 else 0
+        host_similarity = len(hosts1 & hosts2) / max(len(hosts1), len(hosts2))
+        protocol_similarity = len(protocols1 & protocols2) / max(len(protocols1), len(protocols2))
         
         return (host_similarity + protocol_similarity) / 2
 
-    def _compare_file_patterns(self, patterns1: Dict, patterns2: Dict) -> float:
+    def _compare_file_patterns(self, features1: _AlertFeatures, features2: _AlertFeatures) -> float:
         """Compare file access patterns"""
-        if not patterns1 or not patterns2:
+        if not features1.has_file_patterns or not features2.has_file_patterns:
             return 0.0
             
         similarity = 0.0
-        indicators = ['encryption_detected', 'ransom_note_found']
         
-        for indicator in indicators:
-            if (patterns1.get(indicator) and patterns2.get(indicator) and
-                patterns1[indicator] == patterns2[indicator]):
-                similarity += 0.5
+        if features1.encryption_detected and features1.encryption_detected == features2.encryption_detected:
+            similarity += 0.5
+        if features1.ransom_note_found and features1.ransom_note_found == features2.ransom_note_found:
+            similarity += 0.5
         
         # Compare file extensions
-        ext1 = set(patterns1.get('extensions_changed', []))
-        ext2 = set(patterns2.get('extensions_changed', []))
+        ext1, ext2 = features1.extensions, features2.extensions
         if ext1 and ext2:
-            ext_similarity = len(ext1.intersection(ext2)) / max(len(ext1), len(ext2))
+            ext_similarity = len(ext1 & ext2) / max(len(ext1), len(ext2))
             similarity += ext_similarity * 0.5
             
         return min(1.0, similarity)
 
-    def _build_attack_timeline(self, current_alert: ThreatAlert, related_alerts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Build chronological attack timeline"""
-        timeline = []
+    def _analyze_related(self, current_alert: ThreatAlert, related_alerts: List[Dict[str, Any]],
+                         similarity_scores: List[float]) -> _RelatedAnalysis:
+        """Collect timeline events, agents, indicators and scores from the related alerts in one pass"""
+        timeline_events = []
+        related_agents = []
+        malware_sources: Dict[str, List[str]] = {}
+        suspicious_connections = []
+        similarity_total = 0.0
+        
+        if current_alert.malware_process:
+            malware_sources[current_alert.malware_process] = [current_alert.agent_id]
+        
+        for alert, similarity in zip(related_alerts, similarity_scores):
+            agent_id = alert['agent_id']
+            malware = alert.get('malware_process')
+            similarity_total += similarity
+            related_agents.append(agent_id)
+            
+            timeline_events.append({
+                'timestamp': alert['timestamp'],
+                'agent': agent_id,
+                'event_type': 'RELATED_ACTIVITY',
+                'severity': alert['threat_level'],
+                'description': f"Suspicious activity: {alert.get('malware_process', 'unknown process')}",
+                'similarity_score': similarity,
+                'relationship': self._determine_relationship(similarity)
+            })
+            
+            if malware:
+                sources = malware_sources.get(malware)
+                if sources is None:
+                    malware_sources[malware] = [current_alert.agent_id, agent_id]
+                else:
+                    sources.append(agent_id)
+            
+            for conn in alert.get('forensic_data', {}).get('network_connections', []):
+                if conn.get('port') in _SUSPICIOUS_PORTS and conn.get('direction') == 'outbound':
+                    suspicious_connections.append(conn)
         
+        return _RelatedAnalysis(timeline_events, related_agents, malware_sources, suspicious_connections, similarity_total)
+
+    def _build_attack_timeline(self, current_alert: ThreatAlert, related_events: List[Dict[str, Any]],
+                               current_connections: List[Dict], current_file_patterns: Dict) -> List[Dict[str, Any]]:
+        """Build chronological attack timeline"""
         # Add current alert as main event
-        timeline.append({
+        timeline = [{
             'timestamp': current_alert.timestamp.isoformat(),
             'agent': current_alert.agent_id,
             'event_type': 'PRIMARY_DETECTION',
             'severity': current_alert.threat_level.value,
             'description': f"Malware '{current_alert.malware_process}' detected with {current_alert.detection_confidence} confidence",
             'forensic_evidence': {
-                'files_modified': current_alert.forensic_data.get('file_access_patterns', {}).get('files_modified', 0),
-                'network_connections': len(current_alert.forensic_data.get('network_connections', [])),
-                'encryption_detected': current_alert.forensic_data.get('file_access_patterns', {}).get('encryption_detected', False)
+                'files_modified': current_file_patterns.get('files_modified', 0),
+                'network_connections': len(current_connections),
+                'encryption_detected': current_file_patterns.get('encryption_detected', False)
             }
-        })
+        }]
         
         # Add related events
-        for alert in related_alerts:
-            timeline.append({
-                'timestamp': alert['timestamp'],
-                'agent': alert['agent_id'],
-                'event_type': 'RELATED_ACTIVITY',
-                'severity': alert['threat_level'],
-                'description': f"Suspicious activity: {alert.get('malware_process', 'unknown process')}",
-                'similarity_score': alert.get('similarity_score', 0),
-                'relationship': self._determine_relationship(current_alert, alert)
-            })
+        timeline.extend(related_events)
         
         # Sort by timestamp
         timeline.sort(key=lambda x: x['timestamp'])
         return timeline
 
-    def _determine_relationship(self, current_alert: ThreatAlert, related_alert: Dict[str, Any]) -> str:
-        """Determine relationship between alerts"""
-        similarity = related_alert.get('similarity_score', 0)
-        
+    def _determine_relationship(self, similarity: float) -> str:
+        """Determine relationship between alerts from their similarity score"""
         if similarity > 0.7:
             return "DIRECTLY_RELATED"
         elif similarity > 0.4:
@@ -169,75 +312,76 @@ class ForensicCorrelator:
         else:
             return "POSSIBLY_RELATED"
 
-    def _build_propagation_graph(self, current_alert: ThreatAlert, related_alerts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _build_propagation_graph(self, current_alert: ThreatAlert, related_agents: List[str],
+                                 current_connections: List[Dict], current_file_patterns: Dict) -> Dict[str, Any]:
         """Build attack propagation graph"""
+        source_agent = current_alert.agent_id
         graph = {
-            'patient_zero': current_alert.agent_id,
-            'infected_nodes': [current_alert.agent_id],
+            'patient_zero': source_agent,
+            'infected_nodes': [source_agent],
             'exposed_nodes': [],
             'contained_nodes': [],
             'propagation_paths': [],
-            'attack_vector': self._identify_attack_vector(current_alert)
+            'attack_vector': self._identify_attack_vector(current_connections, current_file_patterns)
         }
         
+        # Exposed nodes are kept in first-seen order without duplicates
+        exposed_nodes = graph['exposed_nodes']
+        seen = set()
+        
         # Analyze network connections for propagation attempts
-        network_connections = current_alert.forensic_data.get('network_connections', [])
-        for conn in network_connections:
+        detected_at = current_alert.timestamp.isoformat()
+        for conn in current_connections:
             if conn.get('direction') == 'outbound':
                 graph['propagation_paths'].append({
-                    'source': current_alert.agent_id,
+                    'source': source_agent,
                     'target': conn.get('remote_host'),
                     'protocol': conn.get('protocol'),
                     'port': conn.get('port'),
-                    'timestamp': current_alert.timestamp.isoformat()
+                    'timestamp': detected_at
                 })
-                graph['exposed_nodes'].append(conn.get('remote_host'))
+                remote_host = conn.get('remote_host')
+                if remote_host not in seen:
+                    seen.add(remote_host)
+                    exposed_nodes.append(remote_host)
         
         # Add related alerts to graph
-        for alert in related_alerts:
-            if alert['agent_id'] not in graph['infected_nodes']:
-                graph['exposed_nodes'].append(alert['agent_id'])
-        
-        # Remove duplicates
-        graph['exposed_nodes'] = list(set(graph['exposed_nodes']))
+        for agent_id in related_agents:
+            if agent_id not in graph['infected_nodes'] and agent_id not in seen:
+                seen.add(agent_id)
+                exposed_nodes.append(agent_id)
         
         return graph
 
-    def _identify_attack_vector(self, alert: ThreatAlert) -> str:
-        """Identify primary attack vector"""
-        network_connections = alert.forensic_data.get('network_connections', [])
-        file_patterns = alert.forensic_data.get('file_access_patterns', {})
-        
+    def _identify_attack_vector(self, network_connections: List[Dict], file_patterns: Dict) -> str:
+        """Identify primary attack vector from an alert's forensic data"""
         if file_patterns.get('encryption_detected'):
             return "FILE_ENCRYPTION"
-        elif any('SMB' in conn.get('protocol', '') for conn in network_connections):
-            return "NETWORK_SHARING"
-        elif any('RDP' in conn.get('protocol', '') for conn in network_connections):
-            return "REMOTE_ACCESS"
-        else:
-            return "UNKNOWN_VECTOR"
-
-    def _analyze_temporal_patterns(self, current_alert: ThreatAlert, related_alerts: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Analyze temporal patterns in the attack"""
-        if not related_alerts:
-            return {'pattern': 'ISOLATED_INCIDENT', 'confidence': 0.9}
-        
-        timestamps = [current_alert.timestamp] + [
-            datetime.fromisoformat(alert['timestamp']) if isinstance(alert['timestamp'], str) else alert['timestamp']
-            for alert in related_alerts
-        ]
         
-        timestamps.sort()
-        time_diffs = []
+        # One pass over the connections; SMB outranks RDP wherever it appears
+        remote_access = False
+        for conn in network_connections:
+            protocol = conn.get('protocol', '')
+            if 'SMB' in protocol:
+                return "NETWORK_SHARING"
+            if 'RDP' in protocol:
+                remote_access = True
         
-        for i in range(1, len(timestamps)):
-            diff = (timestamps[i] - timestamps[i-1]).total_seconds() / 60  # minutes
-            time_diffs.append(diff)
+        return "REMOTE_ACCESS" if remote_access else "UNKNOWN_VECTOR"
+
+    def _analyze_temporal_patterns(self, current_alert: ThreatAlert, related_times: List[datetime]) -> Dict[str, Any]:
+        """Analyze temporal patterns in the attack from the related alerts' parsed timestamps"""
+        if not related_times:
+            return {'pattern': 'ISOLATED_INCIDENT', 'confidence': 0.9}
         
-        if not time_diffs:
-            return {'pattern': 'SINGLE_EVENT', 'confidence': 0.8}
+        # The gaps between consecutive events sum to the overall span, so
+        # the average gap only needs the earliest and latest events
+        earliest = min(current_alert.timestamp, *related_times)
+        latest = max(current_alert.timestamp, *related_times)
+        gap_count = len(related_times)
         
-        avg_diff = sum(time_diffs) / len(time_diffs)
+        total_span = (latest - earliest).total_seconds() / 60  # minutes
+        avg_diff = total_span / gap_count
         
         if avg_diff < 5:  # Events within 5 minutes
             pattern = "RAPID_BURST"
@@ -253,54 +397,50 @@ class ForensicCorrelator:
             'pattern': pattern,
             'confidence': confidence,
             'average_time_between_events_minutes': avg_diff,
-            'total_time_span_minutes': (timestamps[-1] - timestamps[0]).total_seconds() / 60
+            'total_time_span_minutes': total_span
         }
 
-    def _calculate_correlation_confidence(self, current_alert: ThreatAlert, related_alerts: List[Dict[str, Any]]) -> float:
+    def _calculate_correlation_confidence(self, related_count: int, similarity_total: float) -> float:
         """Calculate overall correlation confidence"""
-        if not related_alerts:
+        if not related_count:
             return 0.3  # Low confidence for isolated alerts
             
         # Base confidence on number of related alerts
-        base_confidence = min(0.7, len(related_alerts) * 0.1)
+        base_confidence = min(0.7, related_count * 0.1)
         
         # Adjust based on similarity scores
-        avg_similarity = sum(alert.get('similarity_score', 0) for alert in related_alerts) / len(related_alerts)
+        avg_similarity = similarity_total / related_count
         similarity_boost = avg_similarity * 0.3
         
         return min(1.0, base_confidence + similarity_boost)
 
-    def _extract_cross_agent_indicators(self, current_alert: ThreatAlert, related_alerts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _extract_cross_agent_indicators(self, current_alert: ThreatAlert, related: _RelatedAnalysis,
+                                        current_connections: List[Dict]) -> List[Dict[str, Any]]:
         """Extract indicators of compromise across multiple agents"""
         indicators = []
+        source_agent = current_alert.agent_id
         
-        # Collect unique malware processes
-        malware_processes = set()
-        if current_alert.malware_process:
-            malware_processes.add(current_alert.malware_process)
-        malware_processes.update(alert.get('malware_process') for alert in related_alerts if alert.get('malware_process'))
-        
-        for malware in malware_processes:
+        # One indicator per unique malware process, with every reporting agent
+        for malware, sources in related.malware_sources.items():
             indicators.append({
                 'type': 'MALWARE_PROCESS',
                 'value': malware,
                 'confidence': 0.8,
-                'sources': [current_alert.agent_id] + [a['agent_id'] for a in related_alerts if a.get('malware_process') == malware]
+                'sources': sources
             })
         
-        # Collect network indicators
-        all_connections = current_alert.forensic_data.get('network_connections', [])
-        for alert in related_alerts:
-            all_connections.extend(alert.get('forensic_data', {}).get('network_connections', []))
-            
-        suspicious_ports = {445, 3389, 22, 23}  # SMB, RDP, SSH, Telnet
-        for conn in all_connections:
-            if conn.get('port') in suspicious_ports and conn.get('direction') == 'outbound':
-                indicators.append({
-                    'type': 'SUSPICIOUS_CONNECTION',
-                    'value': f"{conn.get('protocol')}://{conn.get('remote_host')}:{conn.get('port')}",
-                    'confidence': 0.7,
-                    'sources': [current_alert.agent_id]  # Simplified for demo
-                })
+        # Network indicators: the current alert's connections, then the
+        # related alerts' already-filtered ones
+        current_suspicious = [
+            conn for conn in current_connections
+            if conn.get('port') in _SUSPICIOUS_PORTS and conn.get('direction') == 'outbound'
+        ]
+        for conn in (*current_suspicious, *related.suspicious_connections):
+            indicators.append({
+                'type': 'SUSPICIOUS_CONNECTION',
+                'value': f"{conn.get('protocol')}://{conn.get('remote_host')}:{conn.get('port')}",
+                'confidence': 0.7,
+                'sources': [source_agent]  # Simplified for demo
+            })
         
         return indicators
\ No newline at end of file
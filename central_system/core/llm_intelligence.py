@@ -1,7 +1,10 @@
 import logging
 import json
 import asyncio
-from typing import Dict, Any, List
+import hashlib
+import orjson
+import time
+from typing import Dict, Any, List, Tuple
 from models.schemas import LLMAnalysis, ThreatAlert
 from config.settings import settings
 
@@ -16,6 +19,8 @@ class LLMIntelligence:
         self.llm_config = settings.get_llm_config()
         self.threat_patterns = self._load_threat_patterns()
         self.available_providers = self._detect_available_providers()
+        # Recent analyses keyed by alert fingerprint: key -> (stored_at, analysis)
+        self._analysis_cache: Dict[bytes, Tuple[float, LLMAnalysis]] = {}
         
         self.logger.info(f"Available LLM Providers: {self.available_providers}")
         self.logger.info(f"Fallback order: {self.llm_config['fallback_order']}")
@@ -96,6 +101,21 @@ class LLMIntelligence:
         Perform LLM-powered threat analysis with multi-fallback
         Tries providers in order until one works
         """
+        cache_key = self._analysis_cache_key(alert, correlation_data)
+        cached = self._analysis_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < settings.LLM_CACHE_TTL:
+            self.logger.info(f"♻️ Reusing cached LLM analysis for {alert.agent_id}")
+            return cached[1].copy()
+        
+        result, from_provider = await self._analyze_with_fallback(alert, correlation_data)
+        # The all-providers-failed fallback is not worth reusing; the next
+        # alert should get another chance at a real analysis
+        if from_provider:
+            self._store_analysis(cache_key, result)
+        return result
+
+    async def _analyze_with_fallback(self, alert: ThreatAlert, correlation_data: Dict[str, Any]) -> Tuple[LLMAnalysis, bool]:
+        """Run the analysis through the configured providers; the flag is False for the ultimate fallback"""
         self.logger.info(f"🔍 Starting multi-fallback LLM analysis for {alert.agent_id}")
         
         # Try providers in fallback order
@@ -112,7 +132,7 @@ class LLMIntelligence:
                         result = self._simulate_llm_analysis(alert, correlation_data)
                     
                     self.logger.info(f"✅ Successfully used {provider.upper()} for analysis")
-                    return result
+                    return result, True
                     
                 except Exception as e:
                     self.logger.warning(f"❌ {provider.upper()} analysis failed: {str(e)}")
@@ -123,7 +143,85 @@ class LLMIntelligence:
         
         # If all providers fail, use ultimate fallback
         self.logger.error("💥 All LLM providers failed, using ultimate fallback")
-        return self._ultimate_fallback_analysis(alert, correlation_data)
+        return self._ultimate_fallback_analysis(alert, correlation_data), False
+
+    def _analysis_cache_key(self, alert: ThreatAlert, correlation_data: Dict[str, Any]) -> bytes:
+        """Fingerprint the alert fields that drive the analysis"""
+        fingerprint = "|".join((
+            alert.agent_id,
+            str(alert.malware_process),
+            alert.threat_level.value,
+            str(len(correlation_data.get('related_alerts', [])))
+        )).encode()
+        # The forensic evidence is part of the prompt, so an escalating
+        # infection (encryption, ransom note, more files) gets a new analysis
+        forensic = orjson.dumps(alert.forensic_data, option=orjson.OPT_SORT_KEYS, default=str)
+        return hashlib.blake2b(fingerprint + b"|" + forensic, digest_size=16).digest()
+
+    def _store_analysis(self, cache_key: bytes, analysis: LLMAnalysis):
+        """Cache an analysis, dropping expired entries first"""
+        now = time.monotonic()
+        expired = [key for key, (stored_at, _) in self._analysis_cache.items()
+                   if now - stored_at >= settings.LLM_CACHE_TTL]
+        for key in expired:
+            del self._analysis_cache[key]
+        self._analysis_cache[cache_key] = (now, analysis.copy())
+
+    def invalidate_cache(self):
+        """Drop all cached analyses"""
+        self._analysis_cache.clear()
+
+    def _select_gemini_model(self, genai) -> Tuple[Any, str]:
+        """Find a working Gemini model (blocking; run in a worker thread)"""
+        # Try multiple model names in order
+        model_names = [
+            "models/gemini-2.0-flash",   # Most recent, fast and capable
+            "models/gemini-2.0-pro",     # Higher quality tier
+            "models/gemini-1.5-flash",
+            "models/gemini-1.5-pro",
+            "models/gemini-1.0-pro",
+        ]
+        
+        model = None
+        successful_model = None
+        
+        for model_name in model_names:
+            try:
+                self.logger.info(f"🔄 Trying Gemini model: {model_name}")
+                model = genai.GenerativeModel(model_name)
+                
+                # Test with a simple prompt to verify it works
+                test_response = model.generate_content(
+                    "Respond with 'OK'", 
+                    generation_config=genai.types.GenerationConfig(max_output_tokens=10)
+                )
+                
+                successful_model = model_name
+                self.logger.info(f"✅ Successfully connected to Gemini model: {model_name}")
+                break
+                
+            except Exception as e:
+                self.logger.debug(f"❌ Model {model_name} failed: {e}")
+                continue
+        
+        if model is None:
+            # Final attempt: use any available model
+            try:
+                models = genai.list_models()
+                for m in models:
+                    if 'generateContent' in m.supported_generation_methods:
+                        model = genai.GenerativeModel(m.name)
+                        successful_model = m.name
+                        self.logger.info(f"✅ Using available model: {m.name}")
+                        break
+            except Exception as e:
+                self.logger.error(f"❌ No working Gemini models found: {e}")
+                raise Exception(f"No working Gemini models available: {e}")
+        
+        if model is None:
+            raise Exception("No Gemini models could be initialized")
+        
+        return model, successful_model
 
     async def _call_gemini_llm(self, alert: ThreatAlert, correlation_data: Dict[str, Any]) -> LLMAnalysis:
         """Call Google Gemini LLM for threat analysis with robust model selection"""
@@ -133,53 +231,8 @@ class LLMIntelligence:
             # Configure Gemini
             genai.configure(api_key=self.llm_config["gemini_api_key"])
             
-            # Try multiple model names in order
-            model_names = [
-                "models/gemini-2.0-flash",   # Most recent, fast and capable
-                "models/gemini-2.0-pro",     # Higher quality tier
-                "models/gemini-1.5-flash",
-                "models/gemini-1.5-pro",
-                "models/gemini-1.0-pro",
-            ]
-            
-            model = None
-            successful_model = None
-            
-            for model_name in model_names:
-                try:
-                    self.logger.info(f"🔄 Trying Gemini model: {model_name}")
-                    model = genai.GenerativeModel(model_name)
-                    
-                    # Test with a simple prompt to verify it works
-                    test_response = model.generate_content(
-                        "Respond with 'OK'", 
-                        generation_config=genai.types.GenerationConfig(max_output_tokens=10)
-                    )
-                    
-                    successful_model = model_name
-                    self.logger.info(f"✅ Successfully connected to Gemini model: {model_name}")
-                    break
-                    
-                except Exception as e:
-                    self.logger.debug(f"❌ Model {model_name} failed: {e}")
-                    continue
-            
-            if model is None:
-                # Final attempt: use any available model
-                try:
-                    models = genai.list_models()
-                    for m in models:
-                        if 'generateContent' in m.supported_generation_methods:
-                            model = genai.GenerativeModel(m.name)
-                            successful_model = m.name
-                            self.logger.info(f"✅ Using available model: {m.name}")
-                            break
-                except Exception as e:
-                    self.logger.error(f"❌ No working Gemini models found: {e}")
-                    raise Exception(f"No working Gemini models available: {e}")
-            
-            if model is None:
-                raise Exception("No Gemini models could be initialized")
+            # Model probing makes blocking SDK calls, so keep it off the event loop
+            model, successful_model = await asyncio.to_thread(self._select_gemini_model, genai)
             
             prompt = self._build_analysis_prompt(alert, correlation_data)
             
@@ -199,7 +252,7 @@ class LLMIntelligence:
             
             llm_output = response.text
             self.logger.info(f"📊 Gemini analysis completed using model: {successful_model}")
-            return self._parse_llm_response(llm_output)
+            return await asyncio.to_thread(self._parse_llm_response, llm_output)
             
         except Exception as e:
             self.logger.error(f"💥 Gemini API call failed: {e}")
@@ -214,7 +267,9 @@ class LLMIntelligence:
             
             prompt = self._build_analysis_prompt(alert, correlation_data)
             
-            response = client.chat.completions.create(
+            # The sync client blocks, so run the request in a worker thread
+            response = await asyncio.to_thread(
+                client.chat.completions.create,
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -232,7 +287,7 @@ class LLMIntelligence:
             
             llm_output = response.choices[0].message.content
             self.logger.info("📊 OpenAI analysis completed successfully")
-            return self._parse_llm_response(llm_output)
+            return await asyncio.to_thread(self._parse_llm_response, llm_output)
             
         except Exception as e:
             self.logger.error(f"💥 OpenAI API call failed: {e}")
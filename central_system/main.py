@@ -8,15 +8,18 @@ import asyncio
 import logging
 import signal
 import sys
-import uuid
+import time
+import orjson
 import uvicorn
 from datetime import datetime
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 
 from utils.logger import setup_logger
+from utils.helpers import generate_incident_id, utc_now_iso, to_epoch
 from config.settings import settings
 from models.database import DatabaseManager
 from agents.agent_manager import AgentManager
@@ -27,20 +30,11 @@ from core.coordination_engine import CoordinationEngine
 from core.adaptive_learner import AdaptiveLearner
 from api.websocket_manager import WebSocketManager
 from api.endpoints import router as api_router
-from admin.routes import router as admin_router
-from api.dependencies import (
-    get_database, get_agent_manager, get_command_dispatcher,
-    get_llm_intelligence, get_forensic_correlator,
-    get_adaptive_learner, get_coordination_engine
-)
+from admin.routes import router as admin_router, warm_template_cache
 
 # Global central system instance
 central_system = None
 
-def generate_incident_id():
-    """Generate unique incident ID"""
-    return f"INC-{uuid.uuid4().hex[:8].upper()}"
-
 class CentralIntelligenceSystem:
     """Main Central Intelligence System Class with FastAPI"""
     
@@ -89,72 +83,90 @@ class CentralIntelligenceSystem:
         try:
             # Step 1: Save initial alert
             await self.db.save_threat_alert(threat_alert)
-            await self.db.save_processing_step(
-                threat_alert.incident_id, 
-                "ALERT_RECEIVED",
-                {
-                    "agent_id": threat_alert.agent_id,
-                    "threat_level": threat_alert.threat_level.value,
-                    "malware_process": threat_alert.malware_process,
-                    "confidence": threat_alert.detection_confidence
-                }
-            )
+            # Keep the correlator's short-lived history cache current so
+            # alerts from the same burst see each other
+            self.forensic_correlator.record_saved_alert(threat_alert)
+            
+            # Each stage depends on the one before it, but the processing-step
+            # log writes do not, so every write overlaps with the next stage.
             
             # Step 2: Forensic correlation
             self.logger.info(f"FORENSIC correlation for {threat_alert.agent_id}")
-            correlation_data = await self.forensic_correlator.correlate_threat(threat_alert)
-            await self.db.save_processing_step(
-                threat_alert.incident_id,
-                "FORENSIC_CORRELATION",
-                {
-                    "related_alerts_count": len(correlation_data.get('related_alerts', [])),
-                    "correlation_confidence": correlation_data.get('correlation_confidence', 0),
-                    "propagation_paths": correlation_data.get('propagation_graph', {}).get('propagation_paths', [])
-                }
+            correlation_data, _ = await asyncio.gather(
+                self.forensic_correlator.correlate_threat(threat_alert),
+                self.db.save_processing_step(
+                    threat_alert.incident_id, 
+                    "ALERT_RECEIVED",
+                    {
+                        "agent_id": threat_alert.agent_id,
+                        "threat_level": threat_alert.threat_level.value,
+                        "malware_process": threat_alert.malware_process,
+                        "confidence": threat_alert.detection_confidence
+                    }
+                )
             )
             
             # Step 3: LLM intelligence analysis
             self.logger.info(f"LLM ANALYSIS for {threat_alert.agent_id}")
-            llm_analysis = await self.llm_intelligence.analyze_threat(threat_alert, correlation_data)
-            await self.db.save_processing_step(
-                threat_alert.incident_id,
-                "LLM_ANALYSIS",
-                {
-                    "attack_classification": llm_analysis.attack_classification,
-                    "confidence_score": llm_analysis.confidence_score,
-                    "business_impact": llm_analysis.business_impact,
-                    "recommended_response": llm_analysis.recommended_network_response
-                }
+            llm_analysis, _ = await asyncio.gather(
+                self.llm_intelligence.analyze_threat(threat_alert, correlation_data),
+                self.db.save_processing_step(
+                    threat_alert.incident_id,
+                    "FORENSIC_CORRELATION",
+                    {
+                        "related_alerts_count": len(correlation_data.get('related_alerts', [])),
+                        "correlation_confidence": correlation_data.get('correlation_confidence', 0),
+                        "propagation_paths": correlation_data.get('propagation_graph', {}).get('propagation_paths', [])
+                    }
+                )
             )
             
             # Step 4: Coordination and response planning
             self.logger.info(f"RESPONSE COORDINATION for {threat_alert.agent_id}")
-            coordination_result = await self.coordination_engine.coordinate_response(
-                threat_alert, llm_analysis, correlation_data
-            )
-            await self.db.save_processing_step(
-                threat_alert.incident_id,
-                "RESPONSE_COORDINATION",
-                {
-                    "risk_level": coordination_result.get('risk_assessment', {}).get('risk_level', 'UNKNOWN'),
-                    "risk_score": coordination_result.get('risk_assessment', {}).get('risk_score', 0),
-                    "agent_commands_count": len(coordination_result.get('response_plan', {}).get('infected_agent_commands', [])),
-                    "network_commands_count": len(coordination_result.get('response_plan', {}).get('network_wide_commands', []))
-                }
+            coordination_result, _ = await asyncio.gather(
+                self.coordination_engine.coordinate_response(
+                    threat_alert, llm_analysis, correlation_data
+                ),
+                self.db.save_processing_step(
+                    threat_alert.incident_id,
+                    "LLM_ANALYSIS",
+                    {
+                        "attack_classification": llm_analysis.attack_classification,
+                        "confidence_score": llm_analysis.confidence_score,
+                        "business_impact": llm_analysis.business_impact,
+                        "recommended_response": llm_analysis.recommended_network_response
+                    }
+                )
             )
             
             # Step 5: Adaptive learning
             self.logger.info(f"ADAPTIVE LEARNING from incident {threat_alert.incident_id}")
+            # Timestamps are epoch seconds from here on so the learner
+            # only does float arithmetic on them
+            alert_data = threat_alert.dict()
+            alert_data['timestamp'] = to_epoch(alert_data['timestamp'])
             incident_data = {
                 'incident_id': threat_alert.incident_id,
-                'alert': threat_alert.dict(),
+                'alert': alert_data,
                 'llm_analysis': llm_analysis.dict(),
                 'correlation_data': correlation_data,
                 'coordination_result': coordination_result,
-                'response_timestamp': datetime.now().isoformat()
+                'response_timestamp': time.time()
             }
             
-            await self.adaptive_learner.learn_from_incident(incident_data)
+            await asyncio.gather(
+                self.adaptive_learner.learn_from_incident(incident_data),
+                self.db.save_processing_step(
+                    threat_alert.incident_id,
+                    "RESPONSE_COORDINATION",
+                    {
+                        "risk_level": coordination_result.get('risk_assessment', {}).get('risk_level', 'UNKNOWN'),
+                        "risk_score": coordination_result.get('risk_assessment', {}).get('risk_score', 0),
+                        "agent_commands_count": len(coordination_result.get('response_plan', {}).get('infected_agent_commands', [])),
+                        "network_commands_count": len(coordination_result.get('response_plan', {}).get('network_wide_commands', []))
+                    }
+                )
+            )
             await self.db.save_processing_step(
                 threat_alert.incident_id,
                 "ADAPTIVE_LEARNING",
@@ -226,6 +238,8 @@ class CentralIntelligenceSystem:
     async def activate_emergency_protocol(self, incident_id: str):
         """Activate emergency protocol manually"""
         self.logger.warning(f"Manual emergency activation for incident: {incident_id}")
+        # Situation has changed, so earlier analyses should not be reused
+        self.llm_intelligence.invalidate_cache()
         # Implementation would activate emergency mode
 
     async def deactivate_emergency_protocol(self, incident_id: str):
@@ -251,6 +265,18 @@ async def lifespan(app: FastAPI):
     if not success:
         sys.exit(1)
     
+    # Share the long-lived components with request dependencies
+    app.state.db = central_system.db
+    app.state.agent_manager = central_system.agent_manager
+    app.state.command_dispatcher = central_system.command_dispatcher
+    app.state.llm_intelligence = central_system.llm_intelligence
+    app.state.forensic_correlator = central_system.forensic_correlator
+    app.state.adaptive_learner = central_system.adaptive_learner
+    app.state.coordination_engine = central_system.coordination_engine
+    app.state.websocket_manager = central_system.websocket_manager
+    
+    warm_template_cache()
+    
     print("\n" + "="*60)
     print("🚀 CENTRAL INTELLIGENCE SYSTEM - FASTAPI - OPERATIONAL")
     print("="*60)
@@ -272,7 +298,8 @@ app = FastAPI(
     title="Central Intelligence System",
     description="Cybersecurity threat intelligence and response coordination system",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -288,15 +315,6 @@ app.add_middleware(
 def get_central_system() -> CentralIntelligenceSystem:
     return central_system
 
-# Override dependencies to use our central system instance
-app.dependency_overrides[get_database] = lambda: central_system.db
-app.dependency_overrides[get_agent_manager] = lambda: central_system.agent_manager
-app.dependency_overrides[get_command_dispatcher] = lambda: central_system.command_dispatcher
-app.dependency_overrides[get_llm_intelligence] = lambda: central_system.llm_intelligence
-app.dependency_overrides[get_forensic_correlator] = lambda: central_system.forensic_correlator
-app.dependency_overrides[get_adaptive_learner] = lambda: central_system.adaptive_learner
-app.dependency_overrides[get_coordination_engine] = lambda: central_system.coordination_engine
-
 # Include API routes
 app.include_router(api_router)
 
@@ -318,15 +336,21 @@ async def root():
         "api_endpoints": "/api/v1/*"
     }
 
-# Health check endpoint
+# Health check endpoint (body regenerated at most once per second)
+_health_cache = {"ts": 0.0, "body": b""}
+
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0",
-        "service": "Central Intelligence System"
-    }
+    now = time.monotonic()
+    if now - _health_cache["ts"] > 1.0:
+        _health_cache["body"] = orjson.dumps({
+            "status": "healthy",
+            "timestamp": utc_now_iso(),
+            "version": "1.0.0",
+            "service": "Central Intelligence System"
+        })
+        _health_cache["ts"] = now
+    return Response(content=_health_cache["body"], media_type="application/json")
 
 # WebSocket endpoint with central_system dependency
 @app.websocket("/ws/{client_id}")
@@ -337,8 +361,13 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
         await central_system.websocket_manager.connect_client(websocket, client_id)
         try:
             while True:
-                message = await websocket.receive_text()
-                await central_system.websocket_manager.process_client_message(websocket, client_id, message)
+                # Read the raw frame so text and binary messages go straight
+                # to the JSON parser without an extra decode step
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                payload = message.get("bytes") or message.get("text")
+                await central_system.websocket_manager.process_client_message(websocket, client_id, payload)
         except WebSocketDisconnect:
             await central_system.websocket_manager.disconnect_client(client_id)
         except Exception as e:
@@ -363,5 +392,8 @@ if __name__ == "__main__":
         host=settings.SERVER_HOST,
         port=settings.SERVER_PORT,
         reload=True,  # Enable auto-reload in development
+        loop="uvloop" if sys.platform != "win32" else "asyncio",
+        http="httptools",
+        ws="websockets",
         log_level="info"
     )
\ No newline at end of file
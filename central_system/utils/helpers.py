@@ -1,14 +1,19 @@
-import uuid
+import itertools
 import json
-from datetime import datetime, timedelta
-from typing import Dict, Any, List
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Union
 import hashlib
 
+# Per-process prefix plus a counter keeps incident IDs unique without
+# reading OS entropy on every alert
+_incident_prefix = secrets.token_hex(4)
+_incident_counter = itertools.count()
+
 def generate_incident_id() -> str:
     """Generate unique incident ID"""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = uuid.uuid4().hex[:8]
-    return f"INC_{timestamp}_{unique_id}"
+    return f"INC-{_incident_prefix}-{next(_incident_counter):08x}"
 
 def generate_agent_id(hostname: str, ip_address: str) -> str:
     """Generate unique agent ID"""
@@ -30,20 +35,19 @@ def validate_threat_alert(alert_data: Dict[str, Any]) -> bool:
     
     return True
 
+# Base risk score per threat level
+_THREAT_WEIGHTS = {
+    'critical': 10.0,
+    'high': 8.0,
+    'medium': 5.0,
+    'low': 3.0,
+    'info': 1.0
+}
+
 def calculate_risk_score(threat_level: str, confidence: float, network_exposure: int) -> float:
     """Calculate comprehensive risk score"""
-    threat_weights = {
-        'critical': 10.0,
-        'high': 8.0,
-        'medium': 5.0,
-        'low': 3.0,
-        'info': 1.0
-    }
-    
-    base_score = threat_weights.get(threat_level, 5.0)
-    exposure_multiplier = 1.0 + (network_exposure * 0.1)
-    
-    return min(10.0, base_score * confidence * exposure_multiplier)
+    base_score = _THREAT_WEIGHTS.get(threat_level, 5.0)
+    return min(10.0, base_score * confidence * (1.0 + network_exposure * 0.1))
 
 def format_timestamp(timestamp: str = None) -> str:
     """Format timestamp for consistency"""
@@ -51,6 +55,24 @@ def format_timestamp(timestamp: str = None) -> str:
         return datetime.now().isoformat()
     return timestamp
 
+# Last formatted timestamp, reused for calls within the same millisecond
+_ts_cache = [0.0, ""]
+
+def utc_now_iso() -> str:
+    """Current UTC time as an ISO-8601 string for response stamps, cached for 1ms"""
+    t = time.time()
+    if t - _ts_cache[0] > 0.001:
+        _ts_cache[:] = [t, datetime.fromtimestamp(t, timezone.utc).isoformat()]
+    return _ts_cache[1]
+
+def to_epoch(value: Union[str, datetime, float, int]) -> float:
+    """Epoch seconds for an ISO-8601 string, datetime or number"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
 def deep_merge_dicts(dict1: Dict, dict2: Dict) -> Dict:
     """Deep merge two dictionaries"""
     result = dict1.copy()